@@ -0,0 +1,347 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""Batch analysis of many positions, spread over the engines of an engine pool."""
+
+import queue
+import threading
+import time
+
+import chess
+import chess.engine
+import engine_pool
+
+# The number of positions that may be waiting to be analysed or to be handed
+# back, for each engine
+QUEUE_SIZE_PER_ENGINE = 4
+
+# How often the engines hand over their analysis while searching; everything
+# but the final analysis of each position is thrown away, so this is long
+COALESCE_INTERVAL = 60
+
+class Stats:
+    """The throughput of a batch analysis."""
+
+    def __init__(self):
+        self.positions = 0
+        self.nodes = 0
+        self.started = time.monotonic()
+
+    def __str__(self):
+        return "%s positions in %.1f s (%.1f positions/s, %.0f nodes/s)" % (
+            self.positions,
+            self.get_seconds(),
+            self.get_positions_per_second(),
+            self.get_nodes_per_second()
+        )
+
+    def add(self, info):
+        """Count a position analysed with the result INFO, an info dict or a
+        list of them for multipv analysis."""
+        if isinstance(info, list):
+            info = info[0] if info != [] else {}
+        self.positions += 1
+        self.nodes += info.get("nodes", 0)
+
+    def get_nodes_per_second(self):
+        """Return the number of nodes searched per second."""
+        return self.nodes / max(self.get_seconds(), 1e-9)
+
+    def get_positions_per_second(self):
+        """Return the number of positions analysed per second."""
+        return self.positions / max(self.get_seconds(), 1e-9)
+
+    def get_seconds(self):
+        """Return the number of seconds since the analysis started."""
+        return time.monotonic() - self.started
+
+class BatchAnalysis:
+    """Analyses many positions with several engines at once.
+
+    The positions are read from the iterable given to analyse() as the engines
+    need them; at most QUEUE_SIZE positions are read ahead of the analysis
+    being handed back, so that a huge iterable is never read into memory. The
+    analysis of each position is handed back in the order of the positions."""
+
+    def __init__(self, limit, engines=None, pool=None, queue_size=None,
+                 multipv=None, info=chess.engine.INFO_ALL):
+
+        if engines is not None and engines < 1:
+            raise ValueError("need at least one engine, got %s" % engines)
+
+        # What to analyse each position with
+        self.limit = limit
+        self.multipv = multipv
+        self.info = info
+
+        # The pool the engines are leased from. Without a pool, use a pool of
+        # our own with ENGINES engines
+        if pool is not None:
+            self.pool = pool
+            self.own_pool = False
+        else:
+            self.pool = engine_pool.EnginePool(max_engines=engines)
+            self.own_pool = True
+
+        # Never run more workers than the pool has engines; a worker waiting
+        # for an engine holds on to its position, and the positions after it
+        # could fill the queue while we wait for that one
+        if engines is None:
+            engines = self.pool.max_engines
+        engines = min(engines, self.pool.max_engines)
+        if engines < 1:
+            raise ValueError("need at least one engine, the pool has %s" % self.pool.max_engines)
+        self.engines = engines
+        if queue_size is None:
+            queue_size = QUEUE_SIZE_PER_ENGINE * engines
+        self.queue_size = queue_size
+
+        # The throughput of the last analysis
+        self.stats = Stats()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _analyse_position(self, engine, board, game):
+        """Analyse BOARD with ENGINE, and return the info dict, or a list of
+        them for multipv analysis. The engine coalesces its info lines, so
+        only the final analysis is parsed."""
+
+        analysis = engine.analysis(
+            board,
+            self.limit,
+            multipv=self.multipv,
+            game=game,
+            info=self.info,
+            coalesce=COALESCE_INTERVAL
+        )
+        analysis.wait()
+        if self.multipv is None:
+            return analysis.info
+        else:
+            return analysis.multipv
+
+    def _feed(self, boards, jobs, slots, state):
+        """Put the positions of BOARDS in the JOBS queue, once there is a free
+        slot for each. This runs in a background thread."""
+
+        try:
+            for number, board in enumerate(boards):
+                slots.acquire()
+                if state["stopped"]:
+                    break
+                jobs.put((number, board))
+        except Exception as error:
+            state["error"] = error
+        finally:
+            for x in range(self.engines):
+                jobs.put(None)
+
+    def _work(self, jobs, results, condition, state):
+        """Analyse the positions in the JOBS queue, and add the results to
+        RESULTS. This runs in a background thread for each engine."""
+
+        # Lease an engine for all the positions; the engine keeps its hash
+        # table, as the positions all count as the same game
+        owner = object()
+        engine = None
+        try:
+            while True:
+                job = jobs.get()
+                if job is None or state["stopped"]:
+                    break
+                number, board = job
+
+                # Give an engine that failed back, and try again with another
+                # one. Any error is handed back as the position's result
+                for attempt in range(2):
+                    try:
+                        if engine is None:
+                            engine = self.pool.lease(owner)
+                        result = self._analyse_position(engine, board, owner)
+                        break
+                    except Exception as error:
+                        result = error
+                        if engine is not None:
+                            self.pool.discard(engine)
+                            engine = None
+
+                with condition:
+                    results[number] = result
+                    condition.notify_all()
+        finally:
+            if engine is not None:
+                self.pool.release(engine)
+            with condition:
+                state["workers"] -= 1
+                condition.notify_all()
+
+    def analyse(self, boards):
+        """Analyse each of the BOARDS and yield the info dict of each, or a
+        list of them for multipv analysis, in the order of the boards. Raises
+        the engine's error if a position could not be analysed."""
+
+        self.stats = Stats()
+        jobs = queue.Queue()
+        slots = threading.Semaphore(self.queue_size)
+        results = {}
+        condition = threading.Condition()
+        state = {"stopped": False, "error": None, "workers": self.engines}
+
+        threads = [threading.Thread(
+            target=self._feed,
+            args=(boards, jobs, slots, state),
+            name="BatchAnalysis feed",
+            daemon=True
+        )]
+        for x in range(self.engines):
+            threads.append(threading.Thread(
+                target=self._work,
+                args=(jobs, results, condition, state),
+                name="BatchAnalysis worker",
+                daemon=True
+            ))
+        for thread in threads:
+            thread.start()
+
+        try:
+            number = 0
+            while True:
+                with condition:
+                    while number not in results and state["workers"] > 0:
+                        condition.wait()
+                    if number not in results:
+                        break
+                    result = results.pop(number)
+                slots.release()
+                if isinstance(result, Exception):
+                    raise result
+                self.stats.add(result)
+                yield result
+                number += 1
+            if state["error"] is not None:
+                raise state["error"]
+        finally:
+
+            # Stop the threads if we're stopped early
+            state["stopped"] = True
+            for x in range(self.queue_size + 1):
+                slots.release()
+            for thread in threads:
+                thread.join()
+
+    def analyse_game(self, board):
+        """Analyse each position of the game played on BOARD, and return the
+        info dicts from the starting position to the final one.
+
+        The positions are split into a run of consecutive positions for each
+        engine. Each engine searches its run from the end of the game
+        backwards, so that its hash table already holds the positions that
+        can follow the one it is searching."""
+
+        self.stats = Stats()
+        positions = get_positions(board)
+        size = -(-len(positions) // self.engines)
+        runs = [range(start, min(start + size, len(positions))) for start in range(0, len(positions), size)]
+        results = [None] * len(positions)
+        errors = []
+
+        def analyse_run(run):
+            owner = object()
+            engine = None
+            try:
+                engine = self.pool.lease(owner)
+                for number in reversed(run):
+                    results[number] = self._analyse_position(engine, positions[number], owner)
+            except Exception as error:
+                errors.append(error)
+                if engine is not None:
+                    self.pool.discard(engine)
+                    engine = None
+            finally:
+                if engine is not None:
+                    self.pool.release(engine)
+
+        threads = [threading.Thread(
+            target=analyse_run,
+            args=(run,),
+            name="BatchAnalysis worker",
+            daemon=True
+        ) for run in runs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors != []:
+            raise errors[0]
+
+        for result in results:
+            self.stats.add(result)
+        return results
+
+    def close(self):
+        """Shut down the engines, if the pool is our own."""
+        if self.own_pool:
+            self.pool.close()
+
+def analyse_games(games, limit, **kw):
+    """Analyse each position of each of the GAMES, boards with the game's moves
+    in their move stack. Yield a list of the info dicts of each game's
+    positions, from the starting position to the final one. The keyword
+    arguments are passed to BatchAnalysis."""
+
+    # Every game's positions are analysed in a single batch, and grouped again
+    # when they are handed back
+    games = iter(games)
+    sizes = queue.Queue()
+
+    def get_boards():
+        for game in games:
+            boards = get_positions(game)
+            sizes.put(len(boards))
+            yield from boards
+
+    with BatchAnalysis(limit, **kw) as batch:
+        infos = []
+        for info in batch.analyse(get_boards()):
+            infos.append(info)
+            if len(infos) == sizes.queue[0]:
+                sizes.get()
+                yield infos
+                infos = []
+
+def analyse_positions(boards, limit, **kw):
+    """Analyse each of the BOARDS with LIMIT and yield the info dicts in order.
+    The keyword arguments are passed to BatchAnalysis."""
+    with BatchAnalysis(limit, **kw) as batch:
+        yield from batch.analyse(boards)
+
+def get_positions(board):
+    """Return a board for each position of the game played on BOARD, from the
+    starting position to BOARD's position, without changing BOARD."""
+    position = board.root()
+    boards = [position.copy()]
+    for move in board.move_stack:
+        position.push(move)
+        boards.append(position.copy())
+    return boards
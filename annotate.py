@@ -0,0 +1,145 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""Annotate games with the engine's evaluation of each move, and mark the
+mistakes. Run as a script to annotate the games of a pgn file."""
+
+import argparse
+import sys
+
+import analysis
+import chess
+import chess.engine
+import chess.pgn
+
+# How long the engine searches each position by default
+LIMIT = chess.engine.Limit(time=0.5)
+
+# The evaluations are capped to this many centipawns before comparing them,
+# so that a move that still wins is not marked as a mistake
+MAX_SCORE = 1000
+
+# The NAGs for the moves that lose at least that many centipawns, worst first
+MISTAKES = [
+    (300, chess.pgn.NAG_BLUNDER),
+    (100, chess.pgn.NAG_MISTAKE),
+    (50, chess.pgn.NAG_DUBIOUS_MOVE)
+]
+
+def _get_centipawns(score, color):
+    """Return the capped centipawns of SCORE, a chess.engine.PovScore, from the
+    point of view of COLOR."""
+    centipawns = score.pov(color).score(mate_score=MAX_SCORE)
+    return max(-MAX_SCORE, min(MAX_SCORE, centipawns))
+
+def _get_engines(value):
+    """Return the number of engines given as VALUE on the command line, which
+    must be at least 1."""
+    engines = int(value)
+    if engines < 1:
+        raise argparse.ArgumentTypeError("need at least one engine, got %s" % value)
+    return engines
+
+def annotate_game(batch, board, headers=None):
+    """Analyse each position of the game played on BOARD with BATCH, an
+    analysis.BatchAnalysis, and return the game as a chess.pgn.Game with the
+    evaluation after each move and NAGs for the mistakes. HEADERS are added to
+    the game's headers."""
+
+    infos = batch.analyse_game(board)
+    game = chess.pgn.Game.from_board(board)
+    if headers is not None:
+        game.headers.update(headers)
+
+    node = game
+    position = board.root()
+    for ply, move in enumerate(board.move_stack):
+        node = node.variations[0]
+        position.push(move)
+        before = infos[ply].get("score")
+        after = infos[ply + 1].get("score")
+        if after is None:
+            continue
+
+        # set_eval writes nothing for a mate in 0, so write the mate ourselves
+        if position.is_checkmate():
+            node.comment = "[%eval #0]"
+        else:
+            node.set_eval(after, infos[ply + 1].get("depth"))
+
+        # Mark the move if it lost enough against the evaluation before it
+        if before is not None:
+            color = node.parent.turn()
+            loss = _get_centipawns(before, color) - _get_centipawns(after, color)
+            nag = get_nag(loss)
+            if nag is not None:
+                node.nags.add(nag)
+
+    return game
+
+def get_nag(loss):
+    """Return the NAG for a move that lost LOSS centipawns, or None if the
+    move is fine."""
+    for centipawns, nag in MISTAKES:
+        if loss >= centipawns:
+            return nag
+    return None
+
+def main(args=None):
+    """Annotate the games of the pgn files given in ARGS, the command line
+    arguments, and write them as a single pgn."""
+
+    parser = argparse.ArgumentParser(description="Annotate the games of pgn files with the engine's evaluations.")
+    parser.add_argument("files", nargs="+", help="the pgn files to annotate")
+    parser.add_argument("-o", "--output", help="the pgn file to write the annotated games to (default: standard output)")
+    parser.add_argument("-d", "--depth", type=int, help="the depth to search each position to")
+    parser.add_argument("-t", "--time", type=float, help="the number of seconds to search each position for (default: %s)" % LIMIT.time)
+    parser.add_argument("-e", "--engines", type=_get_engines, help="the number of engines to run at once")
+    args = parser.parse_args(args)
+
+    if args.depth is None and args.time is None:
+        limit = LIMIT
+    else:
+        limit = chess.engine.Limit(depth=args.depth, time=args.time)
+
+    if args.output is None:
+        output = sys.stdout
+    else:
+        output = open(args.output, "w")
+
+    try:
+        with analysis.BatchAnalysis(limit, engines=args.engines) as batch:
+            games = 0
+            for file in args.files:
+                with open(file) as f:
+                    while True:
+                        game = chess.pgn.read_game(f)
+                        if game is None:
+                            break
+                        annotated = annotate_game(batch, game.end().board(), game.headers)
+                        output.write(str(annotated) + "\n\n")
+                        games += 1
+                        print(f"Game {games}: {batch.stats}", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -27,13 +27,19 @@ import os
 import random
 import string
 import sys
+import threading
 import time
 
+import analysis
+import annotate
+import archive
 import chess
+import chess.archive
 import chess.dcn
 import chessboards
 import dcn
 import dialogs
+import engine_pool
 import game
 import messagedialogs
 import pgn
@@ -83,11 +89,20 @@ class App(Gtk.Application):
         # The list of windows
         self.windows = []
 
+        # The engines, shared by all the windows
+        self.engine_pool = engine_pool.EnginePool()
+
         # Load the actions' keyboard shortcuts from settings.json
         self.actions = {}
         with open(SETTINGS_FILE) as f:
             self.actions = json.load(f)["keybindings"]
 
+        # Give actions that are newer than the settings file their default
+        # keyboard shortcuts
+        with open(SETTINGS_DEFAULT_FILE) as f:
+            for action, accels in json.load(f)["keybindings"].items():
+                self.actions.setdefault(action, accels)
+
         # The name of the currently focused window
         self.window = ""
 
@@ -118,9 +133,12 @@ class App(Gtk.Application):
         self.view_toggle_fullscreen = Gio.SimpleAction.new("view-toggle_fullscreen")
 
         self.game_engine_move = Gio.SimpleAction.new("game-engine_move")
+        self.game_stop_engine = Gio.SimpleAction.new("game-stop_engine")
         self.game_random_move = Gio.SimpleAction.new("game-random_move")
         self.game_setup_start_position = Gio.SimpleAction.new("game-setup_start_position")
         self.game_engine_setup_position = Gio.SimpleAction.new("game-engine_setup_position")
+        self.game_search_position = Gio.SimpleAction.new("game-search_position")
+        self.game_analyse_game = Gio.SimpleAction.new("game-analyse_game")
         self.game_type_move = Gio.SimpleAction.new("game-type_move")
 
         self.help_docs = Gio.SimpleAction.new("help-docs")
@@ -152,9 +170,12 @@ class App(Gtk.Application):
         self.view_toggle_fullscreen.connect("activate", self.window_toggle_fullscreen)
 
         self.game_engine_move.connect("activate", self.window_engine_move)
+        self.game_stop_engine.connect("activate", self.window_stop_engine)
         self.game_random_move.connect("activate", self.window_random_move)
         self.game_setup_start_position.connect("activate", self.window_setup_start_position)
         self.game_engine_setup_position.connect("activate", self.window_engine_setup_position)
+        self.game_search_position.connect("activate", self.window_search_position)
+        self.game_analyse_game.connect("activate", self.window_analyse_game)
         self.game_type_move.connect("activate", self.window_focus_move_entry)
 
         self.help_docs.connect("activate", self.show_help)
@@ -188,9 +209,12 @@ class App(Gtk.Application):
         self.actions["app.view-toggle_fullscreen"] = self.get_accels_for_action("app.view-toggle_fullscreen")
 
         self.actions["app.game-engine_move"] = self.get_accels_for_action("app.game-engine_move")
+        self.actions["app.game-stop_engine"] = self.get_accels_for_action("app.game-stop_engine")
         self.actions["app.game-random_move"] = self.get_accels_for_action("app.game-random_move") 
         self.actions["app.game-setup_start_position"] = self.get_accels_for_action("app.game-setup_start_position")
         self.actions["app.game-engine_setup_position"] = self.get_accels_for_action("app.game-engine_setup_position")
+        self.actions["app.game-search_position"] = self.get_accels_for_action("app.game-search_position")
+        self.actions["app.game-analyse_game"] = self.get_accels_for_action("app.game-analyse_game")
         self.actions["app.game-type_move"] = self.get_accels_for_action("app.game-type_move")
 
         self.actions["app.help-docs"] = self.get_accels_for_action("app.help-docs")
@@ -219,9 +243,12 @@ class App(Gtk.Application):
         self.add_action(self.view_flip_chessboard)
         self.add_action(self.view_toggle_fullscreen)
         self.add_action(self.game_engine_move)
+        self.add_action(self.game_stop_engine)
         self.add_action(self.game_random_move)
         self.add_action(self.game_setup_start_position)
         self.add_action(self.game_engine_setup_position)
+        self.add_action(self.game_search_position)
+        self.add_action(self.game_analyse_game)
         self.add_action(self.game_type_move)
         self.add_action(self.help_docs)
         self.add_action(self.help_license)
@@ -256,9 +283,12 @@ class App(Gtk.Application):
         self.set_accels_for_action("app.view-toggle_fullscreen", self.actions["app.view-toggle_fullscreen"])
 
         self.set_accels_for_action("app.game-engine_move", self.actions["app.game-engine_move"])
+        self.set_accels_for_action("app.game-stop_engine", self.actions["app.game-stop_engine"])
         self.set_accels_for_action("app.game-random_move", self.actions["app.game-random_move"])
         self.set_accels_for_action("app.game-setup_start_position", self.actions["app.game-setup_start_position"])
         self.set_accels_for_action("app.game-engine_setup_position", self.actions["app.game-engine_setup_position"])
+        self.set_accels_for_action("app.game-search_position", self.actions["app.game-search_position"])
+        self.set_accels_for_action("app.game-analyse_game", self.actions["app.game-analyse_game"])
         self.set_accels_for_action("app.game-type_move", self.actions["app.game-type_move"])
 
         self.set_accels_for_action("app.help-docs", self.actions["app.help-docs"])
@@ -353,6 +383,18 @@ class App(Gtk.Application):
         main_menubar = builder.get_object("app-menubar")
         self.set_menubar(main_menubar)
 
+        # Start the first engine while the window is being built, so that the
+        # window doesn't wait for it
+        self.engine_pool.prestart()
+
+        # Shut down the engines that nobody has used for a while
+        GLib.timeout_add_seconds(60, self.engine_pool.reap)
+
+    def do_shutdown(self):
+        """Shut down Schach."""
+        self.engine_pool.close()
+        Gtk.Application.do_shutdown(self)
+
     def do_window_activated(self, window_name):
         """Set the current window to the window with the name WINDOW_NAME."""
 
@@ -493,6 +535,10 @@ class App(Gtk.Application):
         """Invoke the current window's engine_move method."""
         self.get_current_window_instance().engine_move()
 
+    def window_stop_engine(self, *args):
+        """Invoke the current window's stop_engine method."""
+        self.get_current_window_instance().stop_engine()
+
     def window_random_move(self, *args):
         """Invoke the current window's random_move method."""
         self.get_current_window_instance().random_move()
@@ -505,6 +551,14 @@ class App(Gtk.Application):
         """Invoke the current window's engine_setup_position method."""
         self.get_current_window_instance().engine_setup_position()
 
+    def window_search_position(self, *args):
+        """Invoke the current window's search_position method."""
+        self.get_current_window_instance().search_position()
+
+    def window_analyse_game(self, *args):
+        """Invoke the current window's analyse_game method."""
+        self.get_current_window_instance().analyse_game()
+
     def window_focus_move_entry(self, *args):
         """Invoke the current window's move_entry method."""
         self.get_current_window_instance().focus_move_entry()
@@ -560,9 +614,13 @@ class Window(Gtk.ApplicationWindow):
         self.main_box.pack_start(self.game_box, True, False, 10)
 
         # The game manager instance
-        self.game = game.Game()
+        self.game = game.Game(pool=self.app.engine_pool)
         self.game.bind_status(self.update_status)
 
+        # The gameindex.GameIndex of the last imported pgn, for searching
+        # positions
+        self.database = None
+
         # The chessboard widget
         self.chessboard = chessboards.ChessBoard(parent=self, size=self.settings["board_size"])
         self.chessboard.bind_move(self.game._push_move)
@@ -570,6 +628,7 @@ class Window(Gtk.ApplicationWindow):
         self.game.bind_chessboard(self.chessboard.update)
 
         # The methods that show dilaogs and promote stuff
+        self.game.show_engine_error = self.show_engine_error
         self.game.show_game_over = self.show_game_over
         self.game.show_game_over_checkmate = self.show_game_over_checkmate
         self.game.show_game_over_fivefold_repetition = self.show_game_over_fivefold_repetition
@@ -608,6 +667,67 @@ class Window(Gtk.ApplicationWindow):
 
         self.show_all()
 
+    def analyse_game(self, *args):
+        """Annotate the current game with the engine's evaluation of each move
+        and mark the mistakes, then save it as a pgn. The analysis runs in a
+        background thread, on all the engines of the pool but one, which is
+        left for playing."""
+
+        if self.game.board.move_stack == []:
+            messagedialogs.show_info(
+                self,
+                "Nothing to analyse",
+                "Make some moves before analysing the game."
+            )
+            return
+
+        self.app.lookup_action("game-analyse_game").set_enabled(False)
+        threading.Thread(
+            target=self.analyse_game_thread,
+            args=(self.game.board.copy(), dict(self.headers)),
+            daemon=True
+        ).start()
+
+    def analyse_game_done(self, game, error=None):
+        """Save GAME, the game annotated by analyse_game, as a pgn. If the
+        analysis failed with ERROR, show the error instead."""
+
+        self.app.lookup_action("game-analyse_game").set_enabled(True)
+        if error is not None:
+            messagedialogs.show_info(
+                self,
+                "Analysis failed",
+                f"The engine could not analyse the game: {error}"
+            )
+            return
+
+        # Get the file
+        file = dialogs.FileSaveAs(
+            parent=self,
+            initialdir=os.environ["HOME"],
+            filters=FILE_FILTERS_PGN
+        ).show()
+        if file is not None:
+            if not ".pgn" in file:
+                file += ".pgn"
+            pgn.save_game(game, file)
+
+    def analyse_game_thread(self, board, headers):
+        """Annotate the game played on BOARD; runs in a background thread."""
+
+        pool = self.app.engine_pool
+        try:
+            with analysis.BatchAnalysis(
+                annotate.LIMIT,
+                engines=max(1, pool.max_engines - 1),
+                pool=pool
+            ) as batch:
+                game = annotate.annotate_game(batch, board, headers)
+        except Exception as error:
+            GLib.idle_add(self.analyse_game_done, None, error)
+        else:
+            GLib.idle_add(self.analyse_game_done, game)
+
     def copy_fen(self, *args):
         """Copy the current game to the clipboard as a fen."""
 
@@ -690,6 +810,11 @@ class Window(Gtk.ApplicationWindow):
         self.play_button.set_tooltip_text("Engine move (Ctrl+E)")
         self.play_button.connect("clicked", self.engine_move)
 
+        # The move now button, to stop the engine's search
+        self.stop_button = Gtk.Button.new_from_icon_name("media-playback-stop-symbolic", 1)
+        self.stop_button.set_tooltip_text("Move now (Ctrl+.)")
+        self.stop_button.connect("clicked", self.stop_engine)
+
         # The random move button
         self.random_button = Gtk.Button.new_from_icon_name("mail-send-receive-symbolic", 1)
         self.random_button.set_tooltip_text("Random move (Ctrl+R)")
@@ -707,6 +832,7 @@ class Window(Gtk.ApplicationWindow):
         # Add the buttons
         self.game_settings_box.pack_start(self.undo_button, False, False, 0)
         self.game_settings_box.pack_start(self.play_button, False, False, 0)
+        self.game_settings_box.pack_start(self.stop_button, False, False, 0)
         self.game_settings_box.pack_start(self.random_button, False, False, 0)
         self.game_settings_box.pack_start(self.redo_button, False, False, 0)
 
@@ -776,13 +902,11 @@ class Window(Gtk.ApplicationWindow):
             self.save_game(append=True)
             self.game.new_game()
             self.reset_headers()
-            for x in range(0, random.randint(0, 30)):
-                self.game.engine_move()
+            self.game.engine_move(moves=random.randint(0, 30))
         elif response == Gtk.ResponseType.NO:
             self.game.new_game()
             self.reset_headers()
-            for x in range(0, random.randint(0, 30)):
-                self.game.engine_move()
+            self.game.engine_move(moves=random.randint(0, 30))
         else:
             pass
 
@@ -800,7 +924,7 @@ class Window(Gtk.ApplicationWindow):
         """Exit the app immediately."""
 
         # Stop the engine
-        self.game.engine.quit()
+        self.game.quit()
 
         # Close the window and give the application the name of the closed window
         self.app.do_window_closed(self.name)
@@ -874,14 +998,16 @@ class Window(Gtk.ApplicationWindow):
             ).show()
         if file is not None:
 
-            # Get the contents of the file
-            games = pgn.load_file(file)
+            # Index the games in the file; only the selected game is parsed.
+            # Keep the index for searching positions
+            games = pgn.load_file(file, INDEX_DIR)
+            self.database = games
             
             # Show the game selection dialog
             response, game = dialogs.GameSelectorDialog(self, games).show_dialog()
             
             # Load the selected game if the user clicked OK
-            if response == Gtk.ResponseType.OK:
+            if response == Gtk.ResponseType.OK and game is not None:
                 self.game.new_game_from_pgn(game)   
                 self.reset_headers()
                 for header in game.headers:
@@ -890,7 +1016,7 @@ class Window(Gtk.ApplicationWindow):
                 self.enable_move_actions()
 
     def load_game(self, file=None, *args):
-        """Load a game from a dcn file."""
+        """Load a game from a dcn file or a compact archive."""
 
         if file is not None:
             file = file
@@ -902,13 +1028,20 @@ class Window(Gtk.ApplicationWindow):
             ).show()
         if file is not None:
             
-            games = dcn.load_file(file)
+            if file.endswith(".sca"):
+                games = archive.load_file(file)
+            else:
+                games = dcn.load_file(file)
             
-            # Show the game selection dialog
-            response, game = dialogs.GameSelectorDialog(self, games).show_dialog()
+            # Show the game selection dialog. The selected game has been read
+            # once it closes, so the file can be closed too
+            try:
+                response, game = dialogs.GameSelectorDialog(self, games).show_dialog()
+            finally:
+                games.close()
             
             # Load the selected game if the user clicked OK
-            if response == Gtk.ResponseType.OK:
+            if response == Gtk.ResponseType.OK and game is not None:
                 self.game.new_game(game)
                 self.headers = game.headers
                 self.set_actions_active()
@@ -1062,6 +1195,10 @@ class Window(Gtk.ApplicationWindow):
         
         self.game.random_move()
 
+    def stop_engine(self, *args):
+        """Make the engine play its move now."""
+        self.game.engine_stop()
+
     def reset_headers(self):
         """Reset self.headers to the default."""
         self.headers = {
@@ -1113,19 +1250,101 @@ class Window(Gtk.ApplicationWindow):
                 filters=FILE_FILTERS
             ).show()
             if file is not None:
-                if not ".dcn" in file:
-                    file += ".dcn"
+                # Save compact archives as they are, and everything else as dcn
+                if file.endswith(".sca"):
+                    saver = archive
+                    game = chess.archive.Game(headers, self.game.board)
+                else:
+                    saver = dcn
+                    if not ".dcn" in file:
+                        file += ".dcn"
+                    game = chess.dcn.Game(self.game.board)
+                    game.headers.update(headers)
 
                 # Save the file
                 if append:
-                    dcn.save_game_append(self.game.board, file, headers)
+                    saver.save_game_append(game, file)
                 else:
-                    dcn.save_game(self.game.board, file, headers)
+                    saver.save_game(game, file)
             else:
                 return True
         else:
             return True
 
+    def search_position(self, *args):
+        """Search the last imported pgn for the games that reach the current
+        position. The search runs in a background thread, since the first
+        search of a file has to replay all of its games."""
+
+        # Ask for a pgn if there isn't one yet
+        if self.database is None:
+            file = dialogs.FileOpen(
+                parent=self,
+                title="Search a Pgn",
+                filters=FILE_FILTERS_PGN
+            ).show()
+            if file is None:
+                return
+            self.database = pgn.load_file(file, INDEX_DIR)
+
+        self.app.lookup_action("game-search_position").set_enabled(False)
+        threading.Thread(
+            target=self.search_position_thread,
+            args=(self.database, self.game.board.copy()),
+            daemon=True
+        ).start()
+
+    def search_position_done(self, database, found, error=None):
+        """Let the user choose one of the games FOUND by search_position, and
+        load it at the searched position. If the search failed with ERROR,
+        show the error instead."""
+
+        self.app.lookup_action("game-search_position").set_enabled(True)
+        if error is not None:
+
+            # The file has probably changed since it was imported, so ask for
+            # a pgn again the next time
+            if self.database is database:
+                self.database = None
+            messagedialogs.show_info(
+                self,
+                "Search failed",
+                f"The pgn could not be searched: {error}"
+            )
+            return
+        if found == []:
+            messagedialogs.show_info(
+                self,
+                "No games found",
+                "None of the games in the file reach this position."
+            )
+            return
+
+        # Show the game selection dialog with the games found
+        plies = dict(found)
+        dialog = dialogs.GameSelectorDialog(self, database, numbers=list(plies))
+        response, game = dialog.show_dialog()
+
+        # Load the selected game if the user clicked OK, and go back to the
+        # position that was searched
+        if response == Gtk.ResponseType.OK and game is not None:
+            self.game.new_game_from_pgn(game)
+            self.reset_headers()
+            for header in game.headers:
+                self.headers[header] = game.headers[header]
+            self.game.move_undo_to_index(plies[dialog.game_selected] - 1)
+            self.set_actions_active()
+            self.enable_move_actions()
+
+    def search_position_thread(self, database, board):
+        """Search DATABASE for BOARD's position; runs in a background thread."""
+        try:
+            found = pgn.find_position(database, board, INDEX_DIR)
+        except Exception as error:
+            GLib.idle_add(self.search_position_done, database, None, error)
+        else:
+            GLib.idle_add(self.search_position_done, database, found)
+
     def set_actions_active(self):
         """Set the actions' sensitivity based on application status."""
 
@@ -1147,6 +1366,13 @@ class Window(Gtk.ApplicationWindow):
             self.app.lookup_action("edit-redo").set_enabled(True)
             self.app.lookup_action("edit-redo_all").set_enabled(True)
 
+        if self.game.engine_thinking:
+            self.stop_button.set_sensitive(True)
+            self.app.lookup_action("game-stop_engine").set_enabled(True)
+        else:
+            self.stop_button.set_sensitive(False)
+            self.app.lookup_action("game-stop_engine").set_enabled(False)
+
         if self.game.board.is_game_over():
             self.play_button.set_sensitive(False)
             self.random_button.set_sensitive(False)
@@ -1213,6 +1439,13 @@ class Window(Gtk.ApplicationWindow):
         info["logo"] = IMAGE_APPLICATION
         dialogs.AboutDialog(self, info).present()
 
+    def show_engine_error(self, error):
+        messagedialogs.show_info(
+            self,
+            "Engine error",
+            f"The engine could not search the position: {error}"
+        )
+
     def show_game_over(self):
         messagedialogs.show_game_over(self)
 
@@ -1272,6 +1505,9 @@ class Window(Gtk.ApplicationWindow):
         try: turn = kw["turn"]
         except:
             turn = None
+        try: san = kw["san"]
+        except:
+            san = None
         try: white_move = kw["white_move"]
         except:
             white_move = None
@@ -1280,8 +1516,8 @@ class Window(Gtk.ApplicationWindow):
             winner = None
 
         if board is not None:
-            self.white_status_frame.set_status(board=board)
-            self.black_status_frame.set_status(board=board)
+            self.white_status_frame.set_status(board=board, san=san)
+            self.black_status_frame.set_status(board=board, san=san)
         if check is not None:
             if check == "white":
                 self.white_status_frame.set_status(check=True)
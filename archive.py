@@ -0,0 +1,120 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""Compact archive (sca) game saving module for Schach."""
+
+import collections.abc
+
+import chess
+import chess.archive
+import gameindex
+
+class ArchiveIndex(gameindex.GameIndex):
+    """The index of the games in an archive. The archive stays mapped to memory
+    while the index is open, and the headers are read from the map when they
+    are asked for, so the index itself only holds the games' offsets; close the
+    index when done with it."""
+
+    def __init__(self, file):
+        gameindex.GameIndex.__init__(self, file, read_game)
+
+        # The memory map of the archive, shared with the other readers of the
+        # file through the page cache
+        self.archive = chess.archive.open_reader(file)
+        self.offsets = self.archive.get_offsets()
+
+        # The columns read the game's headers on demand; the headers of the
+        # last game read are kept, since the columns are read a game at a time
+        self.headers = {header: _HeaderColumn(self, header) for header in gameindex.HEADERS}
+        self.plies = _HeaderColumn(self, None)
+        self.last_number = None
+        self.last_headers = None
+
+    def _get_lower(self, header):
+        """Return the column of HEADER in lowercase. The columns of all the
+        headers are made at once, reading each game's headers only once."""
+        if len(self.headers_lower.get(header, ())) != len(self.offsets):
+            columns = {name: [] for name in gameindex.HEADERS}
+            for number in range(len(self.offsets)):
+                headers, plies = self.read_headers(number)
+                for name, column in columns.items():
+                    column.append(headers.get(name, gameindex.HEADER_DEFAULTS[name]).lower())
+            self.headers_lower = columns
+        return self.headers_lower[header]
+
+    def close(self):
+        """Unmap the archive."""
+        self.archive.close()
+
+    def get_headers(self, number):
+        """Return the indexed headers of game NUMBER as a dict."""
+        headers, plies = self.read_headers(number)
+        return {header: headers.get(header, gameindex.HEADER_DEFAULTS[header])
+            for header in gameindex.HEADERS}
+
+    def read_headers(self, number):
+        """Return the headers and the number of plies of game NUMBER."""
+        if number != self.last_number:
+            self.last_headers = self.archive.read_headers(number)
+            self.last_number = number
+        return self.last_headers
+
+class _HeaderColumn(collections.abc.Sequence):
+    """The column of HEADER in INDEX, an ArchiveIndex; the column of the
+    number of plies if HEADER is None."""
+
+    def __init__(self, index, header):
+        self.index = index
+        self.header = header
+
+    def __getitem__(self, number):
+        if isinstance(number, slice):
+            return [self[n] for n in range(len(self))[number]]
+        if number < 0:
+            number += len(self)
+        if number < 0 or number >= len(self):
+            raise IndexError(number)
+        headers, plies = self.index.read_headers(number)
+        if self.header is None:
+            return plies
+        return headers.get(self.header, gameindex.HEADER_DEFAULTS[self.header])
+
+    def __len__(self):
+        return len(self.index)
+
+def load_file(file):
+    """Index the games in the archive FILE. Returns an ArchiveIndex; only the
+    offset table is read, the headers are read when they are used and the
+    moves are only decoded by its read_game method."""
+    return ArchiveIndex(file)
+
+def read_game(index, number):
+    """Decode game NUMBER of INDEX, an ArchiveIndex, and return it as a
+    chess.archive.Game."""
+    return index.archive.read_game(number)
+
+def save_game(game, file):
+    """Save GAME, a chess.dcn.Game or chess.archive.Game, under FILE, replacing
+    FILE's contents."""
+    chess.archive.write_games(file, [(game.board, game.headers)])
+
+def save_game_append(game, file, fsync=False):
+    """Save GAME at the end of FILE, keeping the games already in it."""
+    chess.archive.append_games(file, [(game.board, game.headers)], fsync)
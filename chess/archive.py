@@ -0,0 +1,277 @@
+# This file is part of the python-chess library.
+# Copyright (C) 2012-2021 Niklas Fiekas <niklas.fiekas@backscattering.de>
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program. If not, see <http://www.gnu.org/licenses/>.
+
+"""
+A compact binary archive of games, the Schach compact archive (``.sca``).
+
+Each move is stored as its index in the sorted list of the position's legal
+moves, so it takes a single byte. The headers and the starting position are
+stored as length-prefixed strings, with the lengths as varints. An offset
+table at the end of the file gives the start of each game, so any game can
+be read without reading the games before it. Archives are read through a
+memory map; see open_reader().
+
+The file layout is::
+
+    "SCA1"
+    the game records, one after another
+    the offset of each game record     8 bytes each, little endian
+    the number of games                8 bytes, little endian
+    "SCA1"
+
+A game record is the number of headers followed by each header's name and
+value, the starting FEN (empty for the standard starting position), and the
+number of moves followed by one byte per move.
+"""
+
+import chess
+import mmap
+import os
+import struct
+
+# The first and last bytes of an archive
+MAGIC = b"SCA1"
+
+# The byte of a null move
+NULL_MOVE = 255
+
+# The offsets and the number of games at the end of the file
+OFFSET_STRUCT = struct.Struct("<Q")
+
+# The size of the number of games and the magic at the end of the file
+FOOTER_SIZE = OFFSET_STRUCT.size + len(MAGIC)
+
+class Game:
+    """A game read from an archive, with its headers and the board with the
+    game's moves."""
+
+    def __init__(self, headers=None, board=None):
+        self.headers = headers if headers is not None else {}
+        self.board = board if board is not None else chess.Board()
+
+class MemoryMappedReader:
+    """Maps a game archive to memory. Only the pages holding the offset table
+    and the games asked for are read from the disk, and readers of the same
+    file share them through the page cache."""
+
+    def __init__(self, file):
+        self.fd = os.open(file, os.O_RDONLY | os.O_BINARY if hasattr(os, "O_BINARY") else os.O_RDONLY)
+
+        try:
+            self.mmap = mmap.mmap(self.fd, 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            os.close(self.fd)
+            raise IOError(f"invalid file size: {file!r} is not a game archive")
+
+        try:
+            size = self.mmap.size()
+            if size < len(MAGIC) + FOOTER_SIZE:
+                raise IOError(f"invalid file size: {file!r} is not a game archive")
+            if self.mmap[:len(MAGIC)] != MAGIC or self.mmap[size - len(MAGIC):] != MAGIC:
+                raise IOError(f"invalid magic: {file!r} is not a game archive")
+            self.count = OFFSET_STRUCT.unpack_from(self.mmap, size - FOOTER_SIZE)[0]
+            self.table_offset = size - FOOTER_SIZE - self.count * OFFSET_STRUCT.size
+        except:
+            self.close()
+            raise
+
+        try:
+            # Python 3.8
+            self.mmap.madvise(mmap.MADV_RANDOM)
+        except AttributeError:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def __len__(self):
+        return self.count
+
+    def _read_record(self, number):
+        """Return the bytes of the record of game NUMBER."""
+        start = self.get_offset(number)
+        if number + 1 < self.count:
+            end = self.get_offset(number + 1)
+        else:
+            end = self.table_offset
+        return self.mmap[start:end]
+
+    def close(self):
+        """Close the archive."""
+        self.mmap.close()
+        try:
+            os.close(self.fd)
+        except OSError:
+            pass
+
+    def get_offset(self, number):
+        """Return the offset of game NUMBER in the file."""
+        if number < 0 or number >= self.count:
+            raise IndexError(number)
+        return OFFSET_STRUCT.unpack_from(self.mmap, self.table_offset + number * OFFSET_STRUCT.size)[0]
+
+    def get_offsets(self):
+        """Return the offsets of all the games in the file."""
+        return list(struct.unpack_from("<%sQ" % self.count, self.mmap, self.table_offset))
+
+    def read_game(self, number):
+        """Decode game NUMBER and return it as a Game."""
+        return decode_game(self._read_record(number))
+
+    def read_headers(self, number):
+        """Return the headers and the number of plies of game NUMBER. Only the
+        start of the record, up to the number of moves, is read."""
+        headers, fen, count, position = _read_header_block(self.mmap, self.get_offset(number))
+        return headers, count
+
+def _read_header_block(data, position):
+    """Return the headers, the starting FEN and the number of moves of the game
+    record at POSITION in DATA, and the position of the record's moves."""
+    headers = {}
+    count, position = _read_varint(data, position)
+    for x in range(count):
+        name, position = _read_string(data, position)
+        headers[name], position = _read_string(data, position)
+    fen, position = _read_string(data, position)
+    count, position = _read_varint(data, position)
+    return headers, fen, count, position
+
+def _read_string(data, position):
+    """Return the varint-prefixed string at POSITION in DATA, and the position
+    after it."""
+    length, position = _read_varint(data, position)
+    return bytes(data[position:position + length]).decode("utf-8"), position + length
+
+def _read_varint(data, position):
+    """Return the varint at POSITION in DATA, and the position after it."""
+    byte = data[position]
+    if byte < 0x80:
+        return byte, position + 1
+    number = 0
+    shift = 0
+    while True:
+        byte = data[position]
+        position += 1
+        number |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return number, position
+        shift += 7
+
+def _sorted_legal_moves(board):
+    """Return the legal moves of BOARD in the order their indexes refer to."""
+    return sorted(board.legal_moves, key=lambda move: (move.from_square, move.to_square, move.promotion or 0))
+
+def _write_string(out, string):
+    """Add STRING to the bytearray OUT, prefixed with its length."""
+    data = string.encode("utf-8")
+    _write_varint(out, len(data))
+    out += data
+
+def _write_varint(out, number):
+    """Add NUMBER to the bytearray OUT as a varint."""
+    while number >= 0x80:
+        out.append((number & 0x7f) | 0x80)
+        number >>= 7
+    out.append(number)
+
+def append_games(file, games, fsync=False):
+    """Add GAMES, an iterable of (board, headers), to the end of the archive
+    FILE, creating it if needed. Only the offset table at the end of the file
+    is rewritten. If FSYNC is True, wait for the games to be on the disk
+    before returning."""
+
+    # Read the offset table, and cut it off the file so the games can go where
+    # it was
+    offsets = []
+    if os.path.exists(file) and os.path.getsize(file) > 0:
+        with open_reader(file) as reader:
+            offsets = reader.get_offsets()
+            end = reader.table_offset
+        mode = "r+b"
+    else:
+        end = None
+        mode = "wb"
+
+    with open(file, mode) as f:
+        if end is None:
+            f.write(MAGIC)
+        else:
+            f.seek(end)
+            f.truncate()
+        for board, headers in games:
+            offsets.append(f.tell())
+            f.write(encode_game(board, headers))
+        f.write(struct.pack("<%sQ" % len(offsets), *offsets))
+        f.write(OFFSET_STRUCT.pack(len(offsets)))
+        f.write(MAGIC)
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+
+def decode_game(data):
+    """Decode the game record DATA and return it as a Game."""
+
+    headers, fen, moves = decode_record(data)
+    board = chess.Board(fen) if fen else chess.Board()
+    for byte in moves:
+        if byte == NULL_MOVE:
+            board.push(chess.Move.null())
+        else:
+            board.push(_sorted_legal_moves(board)[byte])
+    return Game(headers, board)
+
+def decode_record(data):
+    """Split the game record DATA into its headers, its starting FEN and the
+    bytes of its moves, without replaying the moves."""
+
+    headers, fen, count, position = _read_header_block(data, 0)
+    return headers, fen, data[position:position + count]
+
+def encode_game(board, headers):
+    """Return the game record for the moves played on BOARD, with HEADERS."""
+
+    out = bytearray()
+    _write_varint(out, len(headers))
+    for name in headers:
+        _write_string(out, name)
+        _write_string(out, headers[name] or "")
+
+    # The starting position, and the moves made from it
+    root = board.root()
+    fen = root.fen()
+    _write_string(out, "" if fen == chess.STARTING_FEN else fen)
+    _write_varint(out, len(board.move_stack))
+    for move in board.move_stack:
+        if move:
+            out.append(_sorted_legal_moves(root).index(move))
+        else:
+            out.append(NULL_MOVE)
+        root.push(move)
+    return bytes(out)
+
+def open_reader(file):
+    """Return a MemoryMappedReader for the archive FILE."""
+    return MemoryMappedReader(file)
+
+def write_games(file, games, fsync=False):
+    """Write GAMES, an iterable of (board, headers), to the archive FILE,
+    replacing its contents."""
+    if os.path.exists(file):
+        os.remove(file)
+    append_games(file, games, fsync)
@@ -20,6 +20,11 @@ import io
 import xml
 import xml.etree.ElementTree as etree
 
+from xml.sax.saxutils import escape
+
+# The characters to escape in attribute values, besides &, < and >
+ATTRIBUTE_ENTITIES = {"\"": "&quot;", "\n": "&#10;", "\r": "&#13;", "\t": "&#09;"}
+
 class Game:
     """A game created from a board that stores all the headers and other data
     for the dcn file."""
@@ -41,14 +46,6 @@ class Game:
         if board is not None:
             self.from_board(board)
 
-    def _is_odd(self, number):
-        number = str(number)
-        digit = number[len(number) - 1]
-        if digit == "1" or digit == "3" or digit == "5" or digit == "7" or digit == "9":
-            return True
-        else:
-            return False
-
     def create_dcn(self):
         self.game_element = etree.Element("game")
         self.tree = etree.ElementTree(self.game_element)
@@ -61,26 +58,23 @@ class Game:
 
         self.stack_element = etree.Element("stack")
         self.game_element.append(self.stack_element)
-        for move in self.board.move_stack:
+        for move in self.moves:
             move_element = etree.Element("move")
             move_element.text = move.uci()
             self.stack_element.append(move_element)
         return self
 
     def from_board(self, board):
-        self.moves = []
+        """Take the start position and the moves from BOARD, without changing
+        BOARD. Games where black moves first get a null move in front of the
+        moves, since the dcn board only stores the piece placement."""
         self.board = board
-        while self.board.move_stack != []:
-            self.moves.append(self.board.pop())
-        self.start_fen = self.board.fen()
-        self.moves.reverse()
-        for move in self.moves:
-            self.board.push(move)
-        if self.board is not None:
-            if (self.board.turn and not self._is_odd(len(self.board.move_stack) - 1) or
-                not self.board.turn and self._is_odd(len(self.board.move_stack) - 1)):
-                self.board.move_stack.insert(0, chess.Move.from_uci("0000"))
-            self.create_dcn()
+        root = board.root()
+        self.start_fen = root.fen()
+        self.moves = list(board.move_stack)
+        if not root.turn:
+            self.moves.insert(0, chess.Move.null())
+        self.create_dcn()
         return self
     
     def from_file(self, file):
@@ -115,6 +109,26 @@ class Game:
         """Write the game to a file."""
         self.tree.write(file)
 
+    def write_to(self, handle):
+        """Write the game to HANDLE, a file opened in text mode, at its current
+        position. The dcn is written straight from the headers and the moves,
+        in the same form as write, without building the element tree."""
+        handle.write("<game>")
+        for header in self.headers:
+            name = escape(header, ATTRIBUTE_ENTITIES)
+            if self.headers[header] is None:
+                handle.write('<header name="%s" />' % name)
+            else:
+                handle.write('<header name="%s">%s</header>' % (name, escape(self.headers[header])))
+        handle.write('<board fen="%s" />' % escape(self.start_fen, ATTRIBUTE_ENTITIES))
+        if self.moves != []:
+            handle.write("<stack>")
+            handle.write("".join("<move>%s</move>" % move.uci() for move in self.moves))
+            handle.write("</stack>")
+        else:
+            handle.write("<stack />")
+        handle.write("</game>")
+
 if __name__ == "__main__":
     board = chess.Board()
     board.turn = False
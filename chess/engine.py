@@ -39,7 +39,7 @@ import chess
 
 from chess import Color
 from types import TracebackType
-from typing import Any, Callable, Coroutine, Deque, Dict, Generator, Generic, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Tuple, Type, TypeVar, Union
+from typing import Any, Callable, Coroutine, Deque, Dict, FrozenSet, Generator, Generic, Iterable, Iterator, List, Mapping, MutableMapping, Optional, Set, Tuple, Type, TypeVar, Union
 
 try:
     from typing import Literal
@@ -170,7 +170,13 @@ class EventLoopPolicy(asyncio.AbstractEventLoopPolicy):
         return PollingChildWatcher()
 
 
-def run_in_background(coroutine: Callable[[concurrent.futures.Future[T]], Coroutine[Any, Any, None]], *, name: Optional[str] = None, debug: bool = False, _policy_lock: threading.Lock = threading.Lock()) -> T:
+def _install_event_loop_policy(_policy_lock: threading.Lock = threading.Lock()) -> None:
+    with _policy_lock:
+        if not isinstance(asyncio.get_event_loop_policy(), EventLoopPolicy):
+            asyncio.set_event_loop_policy(EventLoopPolicy())
+
+
+def run_in_background(coroutine: Callable[[concurrent.futures.Future[T]], Coroutine[Any, Any, None]], *, name: Optional[str] = None, debug: bool = False) -> T:
     """
     Runs ``coroutine(future)`` in a new event loop on a background thread.
 
@@ -183,9 +189,7 @@ def run_in_background(coroutine: Callable[[concurrent.futures.Future[T]], Corout
     """
     assert asyncio.iscoroutinefunction(coroutine)
 
-    with _policy_lock:
-        if not isinstance(asyncio.get_event_loop_policy(), EventLoopPolicy):
-            asyncio.set_event_loop_policy(EventLoopPolicy())
+    _install_event_loop_policy()
 
     future: concurrent.futures.Future[T] = concurrent.futures.Future()
 
@@ -423,6 +427,7 @@ class Info(enum.IntFlag):
     REFUTATION = 8
     CURRLINE = 16
     ALL = BASIC | SCORE | PV | REFUTATION | CURRLINE
+    LAZY_PV = 32
 
 INFO_NONE = Info.NONE
 INFO_BASIC = Info.BASIC
@@ -431,6 +436,7 @@ INFO_PV = Info.PV
 INFO_REFUTATION = Info.REFUTATION
 INFO_CURRLINE = Info.CURRLINE
 INFO_ALL = Info.ALL
+INFO_LAZY_PV = Info.LAZY_PV
 
 
 class PovScore:
@@ -1095,7 +1101,9 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
             trivial to obtain), ``INFO_SCORE``, ``INFO_PV``,
             ``INFO_REFUTATION``, ``INFO_CURRLINE``, ``INFO_ALL`` or any
             bitwise combination. Some overhead is associated with parsing
-            extra information.
+            extra information. Add ``INFO_LAZY_PV`` to keep UCI principal
+            variations as a :class:`~chess.engine.LazyPv`, which checks the
+            moves only when accessed.
         :param ponder: Whether the engine should keep analysing in the
             background even after the result has been returned.
         :param root_moves: Optional. Consider only root moves from this list.
@@ -1131,7 +1139,9 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
             trivial to obtain), ``INFO_SCORE``, ``INFO_PV``,
             ``INFO_REFUTATION``, ``INFO_CURRLINE``, ``INFO_ALL`` or any
             bitwise combination. Some overhead is associated with parsing
-            extra information.
+            extra information. Add ``INFO_LAZY_PV`` to keep UCI principal
+            variations as a :class:`~chess.engine.LazyPv`, which checks the
+            moves only when accessed.
         :param root_moves: Optional. Limit analysis to a list of root moves.
         :param options: Optional. A dictionary of engine options for the
             analysis. The previous configuration will be restored after the
@@ -1146,7 +1156,7 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
         return analysis.info if multipv is None else analysis.multipv
 
     @abc.abstractmethod
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, coalesce: Optional[float] = None) -> AnalysisResult:
         """
         Starts analysing a position.
 
@@ -1164,12 +1174,20 @@ class Protocol(asyncio.SubprocessProtocol, metaclass=abc.ABCMeta):
             trivial to obtain), ``INFO_SCORE``, ``INFO_PV``,
             ``INFO_REFUTATION``, ``INFO_CURRLINE``, ``INFO_ALL`` or any
             bitwise combination. Some overhead is associated with parsing
-            extra information.
+            extra information. Add ``INFO_LAZY_PV`` to keep UCI principal
+            variations as a :class:`~chess.engine.LazyPv`, which checks the
+            moves only when accessed.
         :param root_moves: Optional. Limit analysis to a list of root moves.
         :param options: Optional. A dictionary of engine options for the
             analysis. The previous configuration will be restored after the
             analysis is complete. You can permanently apply a configuration
             with :func:`~chess.engine.Protocol.configure()`.
+        :param coalesce: Optional. Instead of delivering every line of
+            information sent by the engine, merge the newest information
+            for each root move and deliver it every *coalesce* seconds.
+            Lines that are entirely superseded are never parsed. Pending
+            information is always delivered before the analysis completes.
+            Ignored by XBoard engines.
 
         Returns :class:`~chess.engine.AnalysisResult`, a handle that allows
         asynchronously iterating over the information sent by the engine
@@ -1601,12 +1619,18 @@ class UciProtocol(Protocol):
 
         return await self.communicate(UciPlayCommand)
 
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, coalesce: Optional[float] = None) -> AnalysisResult:
         class UciAnalysisCommand(BaseCommand[UciProtocol, AnalysisResult]):
             def start(self, engine: UciProtocol) -> None:
                 self.analysis = AnalysisResult(stop=lambda: self.cancel(engine))
                 self.sent_isready = False
 
+                # The unparsed info lines of each multipv slot that are not
+                # superseded yet, with the keys they set, and the timer that
+                # delivers them, when coalescing
+                self.pending: Dict[int, List[Tuple[FrozenSet[str], str]]] = {}
+                self.flush_handle: Optional[asyncio.TimerHandle] = None
+
                 if "UCI_AnalyseMode" in engine.options and "UCI_AnalyseMode" not in engine.target_config and all(name.lower() != "uci_analysemode" for name in options):
                     engine._setoption("UCI_AnalyseMode", True)
                 if "MultiPV" in engine.options or (multipv and multipv > 1):
@@ -1644,11 +1668,50 @@ class UciProtocol(Protocol):
                 self.result.set_result(self.analysis)
 
             def _info(self, engine: UciProtocol, arg: str) -> None:
-                self.analysis.post(_parse_uci_info(arg, engine.board, info))
+                if coalesce is None:
+                    self.analysis.post(_parse_uci_info(arg, engine.board, info))
+                    return
+
+                # Strings are never superseded.
+                if arg.startswith("string "):
+                    self._flush(engine)
+                    self.analysis.post(_parse_uci_info(arg, engine.board, info))
+                    return
+
+                # The lines of each slot are merged when they are delivered,
+                # so a line is superseded once every key it sets is set again
+                # by a newer line of the slot.
+                match = _UCI_MULTIPV_REGEX.search(arg)
+                lines = self.pending.setdefault(int(match.group(1)) if match else 1, [])
+                keys = _UCI_INFO_KEYS.intersection(arg.split(" "))
+                lines[:] = [line for line in lines if not line[0] <= keys]
+                lines.append((keys, arg))
+
+                if self.flush_handle is None:
+                    self.flush_handle = engine.loop.call_later(coalesce, self._flush, engine)
+
+            def _flush(self, engine: UciProtocol) -> None:
+                if self.flush_handle is not None:
+                    self.flush_handle.cancel()
+                    self.flush_handle = None
+
+                pending, self.pending = self.pending, {}
+                for slot in sorted(pending):
+                    merged: InfoDict = {}
+                    for keys, line in pending[slot]:
+                        parsed = _parse_uci_info(line, engine.board, info)
+
+                        # A newer score comes with its own bounds, if any.
+                        if "score" in parsed:
+                            merged.pop("lowerbound", None)
+                            merged.pop("upperbound", None)
+                        merged.update(parsed)
+                    self.analysis.post(merged)
 
             def _bestmove(self, engine: UciProtocol, arg: str) -> None:
                 if not self.result.done():
                     raise EngineError("was not searching, but engine sent bestmove")
+                self._flush(engine)
                 best = _parse_uci_bestmove(engine.board, arg)
                 self.set_finished()
                 self.analysis.set_finished(best)
@@ -1658,6 +1721,9 @@ class UciProtocol(Protocol):
 
             def engine_terminated(self, engine: UciProtocol, exc: Exception) -> None:
                 LOGGER.debug("%s: Closing analysis because engine has been terminated (error: %s)", engine, exc)
+                if self.flush_handle is not None:
+                    self.flush_handle.cancel()
+                    self.flush_handle = None
                 self.analysis.set_exception(exc)
 
         return await self.communicate(UciAnalysisCommand)
@@ -1669,39 +1735,116 @@ class UciProtocol(Protocol):
 
 UCI_REGEX = re.compile(r"^[a-h][1-8][a-h][1-8][pnbrqk]?|[PNBRQK]@[a-h][1-8]|0000\Z")
 
+_UCI_MULTIPV_REGEX = re.compile(r"(?:^| )multipv (\d+)")
+
+_UCI_INFO_INTEGERS = frozenset(["depth", "seldepth", "nodes", "multipv", "currmovenumber", "hashfull", "nps", "tbhits", "cpuload"])
+
+_UCI_INFO_KEYS = _UCI_INFO_INTEGERS | frozenset(["time", "ebf", "score", "currmove", "currline", "refutation", "pv", "wdl"])
+
+class LazyPv(typing.Sequence[chess.Move]):
+    """
+    A principal variation kept as the UCI notation sent by the engine.
+
+    The moves are parsed and checked for legality only when the variation is
+    first accessed, so that consumers that never look at most of the
+    variations of a verbose engine don't pay for them. Parsing stops at the
+    first illegal move, like for regular principal variations.
+    """
+
+    def __init__(self, root_board: chess.Board, uci: List[str]) -> None:
+        self.root_board: Optional[chess.Board] = root_board
+        self.uci = uci
+        self._moves: Optional[List[chess.Move]] = None
+
+    def moves(self) -> List[chess.Move]:
+        """Parses and returns the moves of the variation."""
+        if self._moves is None:
+            assert self.root_board is not None
+            board, self.root_board = self.root_board, None
+            fen = board.fen()
+            moves: List[chess.Move] = []
+            try:
+                for uci in self.uci:
+                    moves.append(board.push_uci(uci))
+            except ValueError:
+                LOGGER.error("Exception parsing pv from info: %r, position at root: %s", " ".join(self.uci), fen)
+            self._moves = moves
+        return self._moves
+
+    @typing.overload
+    def __getitem__(self, index: int) -> chess.Move: ...
+    @typing.overload
+    def __getitem__(self, index: slice) -> List[chess.Move]: ...
+    def __getitem__(self, index: Union[int, slice]) -> Union[chess.Move, List[chess.Move]]:
+        return self.moves()[index]
+
+    def __len__(self) -> int:
+        return len(self.moves())
+
+    def __iter__(self) -> Iterator[chess.Move]:
+        return iter(self.moves())
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyPv):
+            return self.moves() == other.moves()
+        elif isinstance(other, list):
+            return self.moves() == other
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({' '.join(self.uci)!r})"
+
+
 def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL) -> InfoDict:
     info: InfoDict = {}
     if not selector:
         return info
 
+    score = bool(selector & INFO_SCORE)
+    pv = bool(selector & INFO_PV)
+    lazy_pv = bool(selector & INFO_LAZY_PV)
+    refutation = bool(selector & INFO_REFUTATION)
+    currline = bool(selector & INFO_CURRLINE)
+
+    # Walk the tokens with an index, rather than popping them off the front of
+    # the list, so that long lines are parsed in linear time.
     tokens = arg.split(" ")
-    while tokens:
-        parameter = tokens.pop(0)
+    end = len(tokens)
+    i = 0
+    while i < end:
+        parameter = tokens[i]
+        i += 1
 
         if parameter == "string":
-            info["string"] = " ".join(tokens)
+            info["string"] = " ".join(tokens[i:])
             break
-        elif parameter in ["depth", "seldepth", "nodes", "multipv", "currmovenumber", "hashfull", "nps", "tbhits", "cpuload"]:
+        elif parameter in _UCI_INFO_INTEGERS:
             try:
-                info[parameter] = int(tokens.pop(0))  # type: ignore
+                i += 1
+                info[parameter] = int(tokens[i - 1])  # type: ignore
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
         elif parameter == "time":
             try:
-                info["time"] = int(tokens.pop(0)) / 1000.0
+                i += 1
+                info["time"] = int(tokens[i - 1]) / 1000.0
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
         elif parameter == "ebf":
             try:
-                info["ebf"] = float(tokens.pop(0))
+                i += 1
+                info["ebf"] = float(tokens[i - 1])
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing %s from info: %r", parameter, arg)
-        elif parameter == "score" and selector & INFO_SCORE:
+        elif parameter == "score" and score:
             try:
-                kind = tokens.pop(0)
-                value = tokens.pop(0)
-                if tokens and tokens[0] in ["lowerbound", "upperbound"]:
-                    info[tokens.pop(0)] = True  # type: ignore
+                kind = tokens[i]
+                i += 1
+                value = tokens[i]
+                i += 1
+                if i < end and tokens[i] in ["lowerbound", "upperbound"]:
+                    info[tokens[i]] = True  # type: ignore
+                    i += 1
                 if kind == "cp":
                     info["score"] = PovScore(Cp(int(value)), root_board.turn)
                 elif kind == "mate":
@@ -1712,50 +1855,67 @@ def _parse_uci_info(arg: str, root_board: chess.Board, selector: Info = INFO_ALL
                 LOGGER.error("Exception parsing score from info: %r", arg)
         elif parameter == "currmove":
             try:
-                info["currmove"] = chess.Move.from_uci(tokens.pop(0))
+                i += 1
+                info["currmove"] = chess.Move.from_uci(tokens[i - 1])
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing currmove from info: %r", arg)
-        elif parameter == "currline" and selector & INFO_CURRLINE:
+        elif parameter == "currline" and currline:
             try:
                 if "currline" not in info:
                     info["currline"] = {}
 
-                cpunr = int(tokens.pop(0))
-                currline: List[chess.Move] = []
-                info["currline"][cpunr] = currline
+                i += 1
+                cpunr = int(tokens[i - 1])
+                currline_moves: List[chess.Move] = []
+                info["currline"][cpunr] = currline_moves
 
                 board = root_board.copy(stack=False)
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    currline.append(board.push_uci(tokens.pop(0)))
+                while i < end and UCI_REGEX.match(tokens[i]):
+                    i += 1
+                    currline_moves.append(board.push_uci(tokens[i - 1]))
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing currline from info: %r, position at root: %s", arg, root_board.fen())
-        elif parameter == "refutation" and selector & INFO_REFUTATION:
+        elif parameter == "refutation" and refutation:
             try:
                 if "refutation" not in info:
                     info["refutation"] = {}
 
                 board = root_board.copy(stack=False)
-                refuted = board.push_uci(tokens.pop(0))
+                i += 1
+                refuted = board.push_uci(tokens[i - 1])
 
                 refuted_by: List[chess.Move] = []
                 info["refutation"][refuted] = refuted_by
 
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    refuted_by.append(board.push_uci(tokens.pop(0)))
+                while i < end and UCI_REGEX.match(tokens[i]):
+                    i += 1
+                    refuted_by.append(board.push_uci(tokens[i - 1]))
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing refutation from info: %r, position at root: %s", arg, root_board.fen())
-        elif parameter == "pv" and selector & INFO_PV:
+        elif parameter == "pv" and pv:
+            if lazy_pv:
+                start = i
+                while i < end and UCI_REGEX.match(tokens[i]):
+                    i += 1
+                info["pv"] = LazyPv(root_board.copy(stack=False), tokens[start:i])  # type: ignore
+                continue
+
             try:
-                pv: List[chess.Move] = []
-                info["pv"] = pv
+                pv_moves: List[chess.Move] = []
+                info["pv"] = pv_moves
                 board = root_board.copy(stack=False)
-                while tokens and UCI_REGEX.match(tokens[0]):
-                    pv.append(board.push_uci(tokens.pop(0)))
+                while i < end and UCI_REGEX.match(tokens[i]):
+                    i += 1
+                    pv_moves.append(board.push_uci(tokens[i - 1]))
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing pv from info: %r, position at root: %s", arg, root_board.fen())
         elif parameter == "wdl":
             try:
-                info["wdl"] = PovWdl(Wdl(int(tokens.pop(0)), int(tokens.pop(0)), int(tokens.pop(0))), root_board.turn)
+                wdl = []
+                for _ in range(3):
+                    i += 1
+                    wdl.append(int(tokens[i - 1]))
+                info["wdl"] = PovWdl(Wdl(wdl[0], wdl[1], wdl[2]), root_board.turn)
             except (ValueError, IndexError):
                 LOGGER.error("Exception parsing wdl from info: %r", arg)
 
@@ -2166,7 +2326,7 @@ class XBoardProtocol(Protocol):
 
         return await self.communicate(XBoardPlayCommand)
 
-    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> AnalysisResult:
+    async def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, coalesce: Optional[float] = None) -> AnalysisResult:
         if multipv is not None:
             raise EngineError("xboard engine does not support multipv")
 
@@ -2702,10 +2862,10 @@ class SimpleEngine:
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
         return future.result()
 
-    def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}) -> SimpleAnalysisResult:
+    def analysis(self, board: chess.Board, limit: Optional[Limit] = None, *, multipv: Optional[int] = None, game: object = None, info: Info = INFO_ALL, root_moves: Optional[Iterable[chess.Move]] = None, options: ConfigMapping = {}, coalesce: Optional[float] = None) -> SimpleAnalysisResult:
         with self._not_shut_down():
             coro = asyncio.wait_for(
-                self.protocol.analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options),
+                self.protocol.analysis(board, limit, multipv=multipv, game=game, info=info, root_moves=root_moves, options=options, coalesce=coalesce),
                 self.timeout)  # Timeout until analysis is *started*
             future = asyncio.run_coroutine_threadsafe(coro, self.protocol.loop)
         return SimpleAnalysisResult(self, future.result())
@@ -2846,3 +3006,149 @@ class SimpleAnalysisResult:
 
     def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
         self.stop()
+
+
+class EngineManager:
+    """
+    Runs many engines on a single event loop in one background thread.
+
+    :func:`chess.engine.SimpleEngine.popen_uci()` starts a new thread with its
+    own event loop for every engine. Engines spawned with
+    :func:`~chess.engine.EngineManager.popen_uci()` instead share the event
+    loop of the manager, so that a pool of engines costs a single thread.
+    The engines are ordinary :class:`~chess.engine.SimpleEngine` instances
+    and are used and shut down in the same way.
+
+    >>> import chess.engine
+    >>>
+    >>> with chess.engine.EngineManager() as manager:
+    ...     engines = [manager.popen_uci("/usr/bin/stockfish") for _ in range(4)]
+    ...     # Use the engines ...
+
+    Closing the manager closes all of its engines and stops the event loop.
+    """
+
+    def __init__(self, *, name: str = "EngineManager", debug: bool = False) -> None:
+        _install_event_loop_policy()
+
+        self._lock = threading.Lock()
+        self._closed = False
+        self._watchers: Dict[SimpleEngine, asyncio.Task[None]] = {}
+        self._starting: Set[asyncio.Task[SimpleEngine]] = set()
+
+        ready: concurrent.futures.Future[asyncio.AbstractEventLoop] = concurrent.futures.Future()
+        self._thread = threading.Thread(target=self._run, args=(ready, debug), name=name, daemon=True)
+        self._thread.start()
+        self.loop = ready.result()
+
+    def _run(self, ready: concurrent.futures.Future[asyncio.AbstractEventLoop], debug: bool) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        loop.set_debug(debug)
+        ready.set_result(loop)
+        try:
+            loop.run_forever()
+        finally:
+            try:
+                for task in asyncio.all_tasks(loop):
+                    task.cancel()
+                loop.run_until_complete(asyncio.gather(*asyncio.all_tasks(loop), return_exceptions=True))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                asyncio.set_event_loop(None)
+                loop.close()
+
+    async def _watch(self, simple_engine: SimpleEngine) -> None:
+        try:
+            returncode = await simple_engine.protocol.returncode
+            simple_engine.returncode.set_result(returncode)
+        finally:
+            simple_engine.close()
+            self._watchers.pop(simple_engine, None)
+
+    def popen(self, Protocol: Type[Protocol], command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """
+        Spawns and initializes an engine on the shared event loop.
+        Returns a :class:`~chess.engine.SimpleEngine` instance.
+        """
+        async def _start() -> SimpleEngine:
+            task = asyncio.current_task()
+            assert task is not None
+            self._starting.add(task)
+            try:
+                transport, protocol = await Protocol.popen(command, setpgrp=setpgrp, **popen_args)
+                simple_engine = SimpleEngine(transport, protocol, timeout=timeout)
+
+                # Watch the process right away, so that it is reaped even if
+                # it fails to initialize.
+                self._watchers[simple_engine] = asyncio.create_task(self._watch(simple_engine))
+                if self._closed:
+                    simple_engine.close()
+                    raise EngineTerminatedError("engine manager closed")
+                try:
+                    await asyncio.wait_for(protocol.initialize(), timeout)
+                except:
+                    simple_engine.close()
+                    raise
+                return simple_engine
+            finally:
+                self._starting.discard(task)
+
+        with self._lock:
+            if self._closed:
+                raise EngineTerminatedError("engine manager closed")
+            future = asyncio.run_coroutine_threadsafe(_start(), self.loop)
+        return future.result()
+
+    def popen_uci(self, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """
+        Spawns and initializes a UCI engine on the shared event loop.
+        Returns a :class:`~chess.engine.SimpleEngine` instance.
+        """
+        return self.popen(UciProtocol, command, timeout=timeout, setpgrp=setpgrp, **popen_args)
+
+    def popen_xboard(self, command: Union[str, List[str]], *, timeout: Optional[float] = 10.0, setpgrp: bool = False, **popen_args: Any) -> SimpleEngine:
+        """
+        Spawns and initializes an XBoard engine on the shared event loop.
+        Returns a :class:`~chess.engine.SimpleEngine` instance.
+        """
+        return self.popen(XBoardProtocol, command, timeout=timeout, setpgrp=setpgrp, **popen_args)
+
+    def close(self, timeout: Optional[float] = 10.0) -> None:
+        """
+        Closes all engines of the manager, waits up to *timeout* seconds for
+        their processes to exit and stops the event loop.
+        """
+        async def _close() -> None:
+            for simple_engine in list(self._watchers):
+                simple_engine.close()
+
+            # Engines that are still being spawned close themselves once
+            # they are, since the manager is closed.
+            if self._starting:
+                await asyncio.wait(list(self._starting), timeout=timeout)
+
+            watchers = list(self._watchers.values())
+            if watchers:
+                await asyncio.wait(watchers, timeout=timeout)
+
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            future = asyncio.run_coroutine_threadsafe(_close(), self.loop)
+        try:
+            future.result()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            if threading.current_thread() is not self._thread:
+                self._thread.join()
+
+    def __enter__(self) -> EngineManager:
+        return self
+
+    def __exit__(self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException], traceback: Optional[TracebackType]) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} ({len(self._watchers)} engines)>"
@@ -34,10 +34,14 @@ from gi.repository import Gdk
 from gi.repository import GdkPixbuf
 from gi.repository import Gtk
 
-class ChessBoard(cairoarea.CairoDrawableArea2):
-    """The chessboard widget."""
+# The index of each square in BOARD_ORDER
+BOARD_INDEXES = {square: index for index, square in enumerate(BOARD_ORDER)}
 
-    def __init__(self, size, parent=None, board=None):
+class _ChessBoardArea(cairoarea.CairoDrawableArea2):
+    """The base class for the chessboard widgets, which draws the board and
+    keeps track of the squares that need to be redrawn."""
+
+    def __init__(self, size, parent=None):
 
         # The instance of Squares to store all the square info in
         self.squares = Squares(size)
@@ -61,20 +65,9 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
         self.press_func = self._func_press
         self.release_func = self._func_release
 
-        # The methods to call on piece move or promotion
-        self._bound_move_method = None
-        self._bound_promotion_method = None
-
         # Whether we are flipped or not
         self.flipped = False
 
-        # The chess.Board instance
-        if board is not None:
-            self.board = board
-        else:
-            self.board = chess.Board()
-        self.from_board(self.board)
-        
         # The parent
         self.parent = parent
 
@@ -87,42 +80,65 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
         self.squaresdict = {}
         self.squaresonly = False
 
-        # The string that contains the board's current position
-        self.string = STARTING_POSITION
+        # The position and the square colors as they were when the board was
+        # last invalidated, so that only the squares that change are redrawn.
+        # None means that the whole board needs to be redrawn
+        self.drawn_string = None
+        self.drawn_squaresdict = {}
 
-        self.show_all()
+        # The string that contains the board's current position
+        self.string = list(STARTING_POSITION)
+
+    def _convert_board_to_string(self, board):
+        """Return the pieces of BOARD as a list of symbols in BOARD_ORDER,
+        with "." for the empty squares."""
+        string = ["."] * 64
+        for square, piece in board.piece_map().items():
+            # BOARD_ORDER starts at a8, while the chess squares start at a1
+            string[square ^ 56] = piece.symbol()
+        return string
+
+    def _convert_index_to_coords(self, index):
+        """Return the tuple (c, r) of the square at INDEX in BOARD_ORDER."""
+        if self.flipped:
+            return (7 - index % 8, 7 - index // 8)
+        else:
+            return (index % 8, index // 8)
 
     def _draw_board(self, event, cr, allocation):
-        x, y, w, h = allocation
-        cr.set_source_rgb(0.0, 0.0, 0.0)
-        cr.fill()
-        for c in self.LETTERS:
-            for r in self.NUMBERS:
-
-                square = "%s%s" % (c, r)
-
-                # Get the row/column numbers
-                cindex, rindex = self.convert_square_to_coords(square)
-
-                # Set the color of the square
-                color = self.convert_square_to_color(square)
-
-                # Set which piece is for this square
-                image, image_name = self.convert_square_to_image(square)
-
-                # Create the squares
-                if self.squaresdict is not None:
-                    try: color = self.squaresdict["%s%s" % (c, r)]
-                    except:
-                        pass
-                exec(f"cr.set_source_rgb(*color)")
-                exec(f"cr.rectangle(cindex * self.square_size, rindex * self.square_size, self.square_size, self.square_size)")
-                exec("cr.fill()")
-                if not self.squaresonly:
-                    exec(f"cr.set_source_surface(cairo.ImageSurface.create_from_png(image), (cindex * self.square_size), (rindex * self.square_size))")
-                    exec(f"cr.paint()")
 
-        self.show_all()
+        # The checkered background. Cairo only paints the part of it that is
+        # being redrawn
+        cr.set_source_surface(self.squares.background, 0, 0)
+        cr.paint()
+
+        # The area that needs to be redrawn
+        x1, y1, x2, y2 = cr.clip_extents()
+
+        for index, square in enumerate(self.BOARD_ORDER):
+
+            # Get the row/column numbers
+            cindex, rindex = self._convert_index_to_coords(index)
+            x = cindex * self.square_size
+            y = rindex * self.square_size
+
+            # Skip the squares that don't need to be redrawn
+            if (x >= x2 or y >= y2 or
+                x + self.square_size <= x1 or y + self.square_size <= y1):
+                continue
+
+            # Paint the highlight, if the square has one
+            color = self.squaresdict.get(square)
+            if color is not None:
+                cr.set_source_rgb(*color)
+                cr.rectangle(x, y, self.square_size, self.square_size)
+                cr.fill()
+
+            # Paint the piece, if there is one
+            piece = self.string[index]
+            if not self.squaresonly and piece in self.squares.surfaces:
+                cr.set_source_surface(self.squares.surfaces[piece], x, y)
+                cr.paint()
 
     def _func_enter_notify(self, event):
         """Event handler for enter notifications."""
@@ -139,56 +155,15 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
     def _func_mouse_scroll(self, event):
         """Event handler for mouse scrolls."""
         pass
-    
+
     def _func_press(self, event):
         """Event handler for button presses."""
-        
-        square = self.convert_screen_coords_to_square((event.x, event.y))
-        # Set the move data
-        if self.get_square_is_ours(square):
-            self.move_from = square
-            self.squaresdict = {}
-            self.squaresdict[square] = COLOR_MOVEFROM
-        else:
-            if self.move_from is not None:
-                self.move_to = square
-                self.move = "%s%s" % (self.move_from, self.move_to)
-                if self.move != None:
-                    move = chess.Move.from_uci(self.move)
-                    if move in self.board.legal_moves:
-                        self.push_move(move)
-                        self.squaresdict = {}
-                        self.squaresdict[self.move_to] = COLOR_MOVETO
-                    else:
-
-                        # Check if the move is a promotion
-                        if self.is_promotion(self.move):
-                            promote_to = self._bound_promotion_method()
-                            promote_to = promote_to.lower()
-                            self.move = self.move + promote_to
-                            move = chess.Move.from_uci(self.move)
-                            self.push_move(move)
-                        self.move = None
-                        self.move_from = None
-                        self.move_to = None
-                        self.squaresdict = {}
-
-        self.update_widget()
+        pass
 
     def _func_release(self, event):
         """Event handler for buttons releases."""
         pass
 
-    def bind_move(self, func):
-        """Bind the board to a call of FUNC when a move is made."""
-        self._bound_move_method = func
-
-    def bind_promotion(self, func):
-        """Bind the board to a call of FUNC when a piece needs to be promoted.
-        FUNC should return a single-character string representing the piece to 
-        promote to."""
-        self._bound_promotion_method = func
-
     def convert_row_column_to_square(self, coords):
         """COORDS must be a tuple of (row, column). Returns a square, "a2" for example."""
         row = coords[0]
@@ -225,36 +200,8 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
     
     def convert_square_to_image(self, square):
         """SQUARE must be in "a4" format. Returns the file path."""
-        c = square[0]
-        r = square[1]
-        piece = self.string[self.BOARD_ORDER.index(square)]
-        image = IMAGE_EMPTY
-        if piece == "K":
-            image = self.squares.IMAGE_K
-        elif piece == "Q":
-            image = self.squares.IMAGE_Q
-        elif piece == "R":
-            image = self.squares.IMAGE_R
-        elif piece == "B":
-            image = self.squares.IMAGE_B
-        elif piece == "N":
-            image = self.squares.IMAGE_N
-        elif piece == "P":
-            image = self.squares.IMAGE_P
-
-        elif piece == "k":
-            image = self.squares.IMAGE_k
-        elif piece == "q":
-            image = self.squares.IMAGE_q
-        elif piece == "r":
-            image = self.squares.IMAGE_r
-        elif piece == "b":
-            image = self.squares.IMAGE_b
-        elif piece == "n":
-            image = self.squares.IMAGE_n
-        elif piece == "p":
-            image = self.squares.IMAGE_p
-        return image, piece
+        piece = self.string[BOARD_INDEXES[square]]
+        return self.squares.images.get(piece, IMAGE_EMPTY), piece
 
     def flip(self):
         """Flip the chessboard."""
@@ -267,14 +214,99 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
             self.NUMBERS = NUMBERS_REVERSED
             self.NUMBERS_REVERSED = NUMBERS
         self.flipped = not self.flipped
+        self.drawn_string = None
+        self.update_widget()
+
+    def update_widget(self):
+        """Update the chessboard, redrawing only the squares whose piece or
+        color has changed since the last update."""
+
+        if self.drawn_string is None:
+            self.queue_draw()
+        else:
+            for index, square in enumerate(self.BOARD_ORDER):
+                if (self.string[index] != self.drawn_string[index] or
+                    self.squaresdict.get(square) != self.drawn_squaresdict.get(square)):
+                    cindex, rindex = self._convert_index_to_coords(index)
+                    self.queue_draw_area(
+                        cindex * self.square_size,
+                        rindex * self.square_size,
+                        self.square_size,
+                        self.square_size
+                    )
+        self.drawn_string = list(self.string)
+        self.drawn_squaresdict = dict(self.squaresdict)
+
+class ChessBoard(_ChessBoardArea):
+    """The chessboard widget."""
+
+    def __init__(self, size, parent=None, board=None):
+
+        _ChessBoardArea.__init__(self, size, parent)
+
+        # The methods to call on piece move or promotion
+        self._bound_move_method = None
+        self._bound_promotion_method = None
+
+        # The chess.Board instance
+        if board is not None:
+            self.board = board
+        else:
+            self.board = chess.Board()
+        self.from_board(self.board)
+
+        self.show_all()
+
+    def _func_press(self, event):
+        """Event handler for button presses."""
+        
+        square = self.convert_screen_coords_to_square((event.x, event.y))
+        # Set the move data
+        if self.get_square_is_ours(square):
+            self.move_from = square
+            self.squaresdict = {}
+            self.squaresdict[square] = COLOR_MOVEFROM
+        else:
+            if self.move_from is not None:
+                self.move_to = square
+                self.move = "%s%s" % (self.move_from, self.move_to)
+                if self.move != None:
+                    move = chess.Move.from_uci(self.move)
+                    if move in self.board.legal_moves:
+                        self.push_move(move)
+                        self.squaresdict = {}
+                        self.squaresdict[self.move_to] = COLOR_MOVETO
+                    else:
+
+                        # Check if the move is a promotion
+                        if self.is_promotion(self.move):
+                            promote_to = self._bound_promotion_method()
+                            promote_to = promote_to.lower()
+                            self.move = self.move + promote_to
+                            move = chess.Move.from_uci(self.move)
+                            self.push_move(move)
+                        self.move = None
+                        self.move_from = None
+                        self.move_to = None
+                        self.squaresdict = {}
+
         self.update_widget()
 
+    def bind_move(self, func):
+        """Bind the board to a call of FUNC when a move is made."""
+        self._bound_move_method = func
+
+    def bind_promotion(self, func):
+        """Bind the board to a call of FUNC when a piece needs to be promoted.
+        FUNC should return a single-character string representing the piece to 
+        promote to."""
+        self._bound_promotion_method = func
+
     def from_board(self, board):
         """Rearrange the board according to BOARD."""
         self.board = board
-        string = str(self.board).replace("\n", " ").split()
         self.squaresonly = False
-        self.string = string
+        self.string = self._convert_board_to_string(board)
         self.update_widget()
 
     def get_square_is_ours(self, square):
@@ -321,6 +353,7 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
         self.squares.set_size(size)
         self.square_size = self.squares.SIZE
         self.set_size_request(self.squares.BOARD_SIZE, self.squares.BOARD_SIZE)
+        self.drawn_string = None
         self.update_widget()
 
     def set_square_color(self, square, color):
@@ -345,110 +378,18 @@ class ChessBoard(cairoarea.CairoDrawableArea2):
                 self.squaresdict = {}
         self.update_widget()
 
-    def update_widget(self):
-        """Update the chessboard."""
-        self.hide()
-        self.show_all()
-
-class SetupChessBoard(cairoarea.CairoDrawableArea2):
+class SetupChessBoard(_ChessBoardArea):
     """The chessboard widget."""
 
     def __init__(self, parent=None):
 
-        # The instance of Squares to store all the square info in
-        self.squares = Squares(1)
-
-        # The size of the squares
-        self.square_size = self.squares.SIZE
-
-        cairoarea.CairoDrawableArea2.__init__(self, self.squares.BOARD_SIZE, self.squares.BOARD_SIZE, self._draw_board)
-
-        # The variables for board-drawing
-        self.LETTERS = LETTERS
-        self.NUMBERS = NUMBERS
-        self.NUMBERS_REVERSED = NUMBERS_REVERSED
-        self.BOARD_ORDER = BOARD_ORDER
-
-        # The event-handling methods
-        self.enter_notify_func = self._func_enter_notify
-        self.leave_notify_func = self._func_leave_notify
-        self.motion_notify_func = self._func_motion_notify
-        self.mouse_scroll_func = self._func_mouse_scroll
-        self.press_func = self._func_press
-        self.release_func = self._func_release
+        _ChessBoardArea.__init__(self, 1, parent)
 
         # The methods to call on piece placement
         self._bound_place_method = None
 
-        # Whether we are flipped or not
-        self.flipped = False
-
-        # The parent
-        self.parent = parent
-
-        # Move data
-        self.move = None
-        self.move_from = None
-        self.move_to = None
-
-        # The chessboard-drawing variables
-        self.squaresdict = {}
-        self.squaresonly = False
-
-        # The string that contains the board's current position
-        self.string = STARTING_POSITION
-
-        self.show_all()
-
-    def _draw_board(self, event, cr, allocation):
-        x, y, w, h = allocation
-        cr.set_source_rgb(0.0, 0.0, 0.0)
-        cr.rectangle(0, 0, w, h)
-        cr.fill()
-        for c in self.LETTERS:
-            for r in self.NUMBERS:
-
-                square = "%s%s" % (c, r)
-
-                # Get the row/column numbers
-                cindex, rindex = self.convert_square_to_coords(square)
-
-                # Set the color of the square
-                color = self.convert_square_to_color(square)
-
-                # Set which piece is for this square
-                image, image_name = self.convert_square_to_image(square)
-
-                # Create the squares
-                if self.squaresdict is not None:
-                    try: color = self.squaresdict["%s%s" % (c, r)]
-                    except:
-                        pass
-                exec(f"cr.set_source_rgb(*color)")
-                exec(f"cr.rectangle(cindex * self.square_size, rindex * self.square_size, self.square_size, self.square_size)")
-                exec("cr.fill()")
-                if not self.squaresonly:
-                    exec(f"cr.set_source_surface(cairo.ImageSurface.create_from_png(image), (cindex * self.square_size), (rindex * self.square_size))")
-                    exec(f"cr.paint()")
-
         self.show_all()
 
-    def _func_enter_notify(self, event):
-        """Event handler for enter notifications."""
-        pass
-
-    def _func_leave_notify(self, event):
-        """Event handler for leave notifications."""
-        pass
-
-    def _func_motion_notify(self, x, y, state):
-        """Event handler for motion notifications."""
-        pass
-
-    def _func_mouse_scroll(self, event):
-        """Event handler for mouse scrolls."""
-        pass
-    
     def _func_press(self, event):
         """Event handler for button presses."""
         
@@ -456,110 +397,26 @@ class SetupChessBoard(cairoarea.CairoDrawableArea2):
         self._bound_place_method(square)
         self.update_widget()
 
-    def _func_release(self, event):
-        """Event handler for buttons releases."""
-        pass
-
     def bind_place(self, func):
         """Bind the board to a call of FUNC when a move is made."""
         self._bound_place_method = func
 
-    def convert_row_column_to_square(self, coords):
-        """COORDS must be a tuple of (row, column). Returns a square, "a2" for example."""
-        row = coords[0]
-        column = coords[1]
-        return "%s%s" % (self.LETTERS[column], self.NUMBERS_REVERSED[row])
-
-    def convert_screen_coords_to_square(self, coords):
-        """COORDS must be a tuple of (x, y). Returns a square, "a2" for example."""
-        x, y = coords
-        c, r = int(str(x / self.square_size)[0]), int(str(y / self.square_size)[0])
-        return self.convert_row_column_to_square((r, c))
-
-    def convert_square_to_color(self, square):
-        """SQUARE must be in "a4" format. Returns either BLACK2 or WHITE2."""
-        c = square[0]
-        r = square[1]
-        if str(c) in ODD_LETTERS:
-            if str(r) in ODD_NUMBERS:
-                color = BLACK2
-            else:
-                color = WHITE2
-        else:
-            if str(r) in ODD_NUMBERS:
-                color = WHITE2
-            else:
-                color = BLACK2
-        return color
-
-    def convert_square_to_coords(self, square):
-        """SQUARE must be in "a4" format. Returns a tuple (c, r)."""
-        c = square[0]
-        r = square[1]
-        return (self.LETTERS.index(c), self.NUMBERS_REVERSED.index(r))
-    
-    def convert_square_to_image(self, square):
-        """SQUARE must be in "a4" format. Returns the file path."""
-        c = square[0]
-        r = square[1]
-        piece = self.string[self.BOARD_ORDER.index(square)]
-        image = IMAGE_EMPTY
-        if piece == "K":
-            image = self.squares.IMAGE_K
-        elif piece == "Q":
-            image = self.squares.IMAGE_Q
-        elif piece == "R":
-            image = self.squares.IMAGE_R
-        elif piece == "B":
-            image = self.squares.IMAGE_B
-        elif piece == "N":
-            image = self.squares.IMAGE_N
-        elif piece == "P":
-            image = self.squares.IMAGE_P
-
-        elif piece == "k":
-            image = self.squares.IMAGE_k
-        elif piece == "q":
-            image = self.squares.IMAGE_q
-        elif piece == "r":
-            image = self.squares.IMAGE_r
-        elif piece == "b":
-            image = self.squares.IMAGE_b
-        elif piece == "n":
-            image = self.squares.IMAGE_n
-        elif piece == "p":
-            image = self.squares.IMAGE_p
-        return image, piece
-
-    def flip(self):
-        """Flip the chessboard."""
-        if self.flipped:
-            self.LETTERS = LETTERS
-            self.NUMBERS = NUMBERS
-            self.NUMBERS_REVERSED = NUMBERS_REVERSED
-        else:
-            self.LETTERS = LETTERS_REVERSED
-            self.NUMBERS = NUMBERS_REVERSED
-            self.NUMBERS_REVERSED = NUMBERS
-        self.flipped = not self.flipped
-        self.update_widget()
-
     def from_board(self, board):
         """Rearrange the board according to BOARD."""
-        string = str(board).replace("\n", " ").split()
         self.squaresonly = False
-        self.string = string
+        self.string = self._convert_board_to_string(board)
         self.update_widget()
 
     def place(self, piece, square):
         """Place PIECE at SQUARE."""
-        self.string[self.BOARD_ORDER.index(square)] = piece
+        self.string[BOARD_INDEXES[square]] = piece
         self.update_widget()
 
-    def update_widget(self):
-        """Update the chessboard."""
-        self.hide()
-        self.show_all()
+# The piece surfaces, by piece and square size, shared by all the boards
+PIECE_SURFACES = {}
+
+# The checkered background surfaces, by square size, shared by all the boards
+BOARD_SURFACES = {}
 
 class Squares:
     """A class for squares that stores the current image paths and square size 
@@ -601,4 +458,37 @@ class Squares:
         self.IMAGE_R = f"{ROOT_PATH}icons/pieces/%sx%s/rook_w.png" % (self.SIZE, self.SIZE)
         self.IMAGE_r = f"{ROOT_PATH}icons/pieces/%sx%s/rook_b.png" % (self.SIZE, self.SIZE)
         self.IMAGE_P = f"{ROOT_PATH}icons/pieces/%sx%s/pawn_w.png" % (self.SIZE, self.SIZE)
-        self.IMAGE_p = f"{ROOT_PATH}icons/pieces/%sx%s/pawn_b.png" % (self.SIZE, self.SIZE)
\ No newline at end of file
+        self.IMAGE_p = f"{ROOT_PATH}icons/pieces/%sx%s/pawn_b.png" % (self.SIZE, self.SIZE)
+
+        # The image paths, by piece symbol
+        self.images = {
+            "K": self.IMAGE_K, "Q": self.IMAGE_Q, "R": self.IMAGE_R,
+            "B": self.IMAGE_B, "N": self.IMAGE_N, "P": self.IMAGE_P,
+            "k": self.IMAGE_k, "q": self.IMAGE_q, "r": self.IMAGE_r,
+            "b": self.IMAGE_b, "n": self.IMAGE_n, "p": self.IMAGE_p
+        }
+
+        # The piece surfaces for this size. The images are only loaded the
+        # first time a size is used
+        self.surfaces = {}
+        for piece, image in self.images.items():
+            if (piece, self.SIZE) not in PIECE_SURFACES:
+                PIECE_SURFACES[(piece, self.SIZE)] = cairo.ImageSurface.create_from_png(image)
+            self.surfaces[piece] = PIECE_SURFACES[(piece, self.SIZE)]
+
+        # The checkered board without any pieces. The light and dark squares
+        # land on the same screen positions when the board is flipped, so one
+        # surface serves both orientations
+        if self.SIZE not in BOARD_SURFACES:
+            surface = cairo.ImageSurface(cairo.FORMAT_RGB24, self.BOARD_SIZE, self.BOARD_SIZE)
+            cr = cairo.Context(surface)
+            cr.set_source_rgb(*BLACK2)
+            cr.paint()
+            cr.set_source_rgb(*WHITE2)
+            for c in range(8):
+                for r in range(8):
+                    if (c + r) % 2 == 0:
+                        cr.rectangle(c * self.SIZE, r * self.SIZE, self.SIZE, self.SIZE)
+            cr.fill()
+            BOARD_SURFACES[self.SIZE] = surface
+        self.background = BOARD_SURFACES[self.SIZE]
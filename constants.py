@@ -105,6 +105,12 @@ APP_INFO = f"{ROOT_PATH}data/appinfo.json"
 # The settings file
 SETTINGS_FILE = f"{CONFIG_DIR}settings.json"
 
+# The directory for the indexes of the game files that were opened
+INDEX_DIR = f"{CONFIG_DIR}index/"
+
+# The default settings file
+SETTINGS_DEFAULT_FILE = f"{ROOT_PATH}data/settings-default.json"
+
 # The menu options file
 MENU_OPTIONS = f"{ROOT_PATH}data/menuoptions.json"
 
@@ -114,6 +120,10 @@ f1 = Gtk.FileFilter()
 f1.set_name("Descriptive chess notation (*.dcn)")
 f1.add_pattern("*.dcn")
 FILE_FILTERS.append(f1)
+f3 = Gtk.FileFilter()
+f3.set_name("Schach compact archive (*.sca)")
+f3.add_pattern("*.sca")
+FILE_FILTERS.append(f3)
 f2 = Gtk.FileFilter()
 f2.set_name("All files")
 f2.add_pattern("*.*")
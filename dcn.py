@@ -20,93 +20,137 @@
 
 """Dcn-format game saving module for Schach."""
 
-import time
+import io
+import os
+import xml.etree.ElementTree as etree
 
 import chess
 import chess.dcn
+import gameindex
+
+# The size of the chunks in which the files are read
+CHUNK_SIZE = 1 << 16
+
+def _index_games(handle, index):
+    """Add the offset, headers and number of plies of each game in HANDLE, a
+    file opened in binary mode, to INDEX. The file is read a chunk at a time
+    and each game's element is thrown away once its headers are read, so only
+    one game is in memory at a time."""
+
+    # The games follow each other in the file, so parse them as the children
+    # of a root element of our own
+    parser = etree.XMLPullParser(events=("start", "end"))
+    parser.feed(b"<games>")
+    root = None
+
+    # The offsets of the games' start tags that we've found so far, and where
+    # the chunk we're reading starts in the file
+    offsets = []
+    chunk_offset = handle.tell()
+    tail = b""
+
+    while True:
+        chunk = handle.read(CHUNK_SIZE)
+
+        # Find the game start tags in the chunk, including one that started
+        # in the last few bytes of the last chunk
+        data = tail + chunk
+        start = 0
+        while True:
+            position = data.find(b"<game", start)
+            if position == -1 or position + 5 >= len(data):
+                break
+            if data[position + 5:position + 6] in (b">", b" ", b"\t", b"\n", b"\r"):
+                offsets.append(chunk_offset - len(data) + len(chunk) + position)
+            start = position + 5
+        tail = data[-5:]
+        chunk_offset += len(chunk)
+
+        # Read the headers of the games that ended in the chunk
+        try:
+            if chunk:
+                parser.feed(chunk)
+            else:
+                parser.feed(b"</games>")
+                parser.close()
+            for event, element in parser.read_events():
+                if event == "start" and element.tag == "games":
+                    root = element
+                elif event == "end" and element.tag == "game":
+                    headers = {}
+                    for header in element.findall("header"):
+                        headers[header.get("name")] = header.text or ""
+                    moves = [move.text for move in element.iter("move")]
+                    if moves != [] and moves[0] == "0000":
+                        moves.pop(0)
+                    index.append(offsets[len(index)], headers, len(moves))
+                    root.remove(element)
+        except etree.ParseError:
+            break
+        if not chunk:
+            break
 
 def load_file(file):
-    """Load the games from FILE."""
+    """Index the games in FILE, reading only their headers. Returns a
+    gameindex.GameIndex; its read_game method parses a single game."""
 
     # Check the file's type before reading it
     if type(file) == type(""):
-        with open(file) as f:
-            games = f.read()
+        index = gameindex.GameIndex(file, read_game)
+        with open(file, "rb") as f:
+            _index_games(f, index)
             f.close()
     else:
-        games = file.read()
-        file.close()
 
-    # Separate the games in the string, and add a chess.dcn.Game instance to
-    # the game_list for each game
-    game_list = []
-    games = games.split("\n\n\n")
-    for game in games:
-        if game != "":
-            dcn_game = chess.dcn.Game().from_string(game)
-            if dcn_game is not None:
-                game_list.append(dcn_game)
+        # Index text files from memory
+        if isinstance(file, io.TextIOBase):
+            file = io.BytesIO(file.read().encode())
+        index = gameindex.GameIndex(file, read_game)
+        _index_games(file, index)
 
-    return game_list
+    return index
+
+def read_game(index, number):
+    """Parse game NUMBER of INDEX, and return it as a chess.dcn.Game."""
+
+    # The game ends where the next one starts
+    start = index.offsets[number]
+    if number + 1 < len(index):
+        size = index.offsets[number + 1] - start
+    else:
+        size = -1
+
+    if type(index.file) == type(""):
+        with open(index.file, "rb") as f:
+            f.seek(start)
+            data = f.read(size)
+            f.close()
+    else:
+        index.file.seek(start)
+        data = index.file.read(size)
+    return chess.dcn.Game().from_string(data.decode("utf-8").strip())
 
 def save_game(game, file):
     """Save the GAME under FILE, replacing FILE's contents."""
 
-    game.write(file)
-    with open(file, "a") as f:
+    with open(file, "w") as f:
+        game.write_to(f)
         f.write("\n\n\n")
         f.close()
 
-def save_game_append(board, file, headers):
-    """Save the current game under the file given.
-    
-    VALID ARGUMENTS:
-        Event, Site, Round, White, Black"""
-    
-    # Get the keyword arguments
-    try: event = headers["Event"]
-    except:
-        event = None
-    try: site = headers["Site"]
-    except:
-        site = None
-    try: date = headers["Date"]
-    except:
-        date = time.strftime("%Y.%m.%d")
-    try: roundno = headers["Round"]
-    except:
-        roundno = None
-    try: white = headers["White"]
-    except:
-        white = None
-    try: black = headers["Black"]
-    except:
-        black = None
-    try: result = headers["Result"]
-    except:
-        result = None
-
-    # Create the dcn.Game
-    dcn = chess.dcn.Game(board)
-
-    # Set the headers
-    dcn.headers["Date"] = date
-    if event:
-        dcn.headers["Event"] = event
-    if site:
-        dcn.headers["Site"] = site
-    if date:
-        dcn.headers["Date"] = date
-    if roundno:
-        dcn.headers["Round"] = roundno
-    if white:
-        dcn.headers["White"] = white
-    if black:
-        dcn.headers["Black"] = black
-    if result:
-        dcn.headers["Result"] = result
-    dcn.create_dcn()
-    dcn.write(file)
+def save_game_append(game, file, fsync=False):
+    """Save GAME at the end of FILE, keeping the games already in it."""
+    save_games_append([game], file, fsync)
+
+def save_games_append(games, file, fsync=False):
+    """Save each of the GAMES at the end of FILE, opening it only once. If FSYNC
+    is True, wait for the games to be on the disk before returning."""
+
     with open(file, "a") as f:
-        f.write("\n\n\n")
-        f.close()
\ No newline at end of file
+        for game in games:
+            game.write_to(f)
+            f.write("\n\n\n")
+        if fsync:
+            f.flush()
+            os.fsync(f.fileno())
+        f.close()
@@ -611,53 +611,65 @@ class FileSaveAs:
 class GameSelectorDialog(_Dialog):
     """The dialog to prompt the user to choose a game from a loaded file."""
 
-    def __init__(self, parent, games):
+    # The number of games to add to the list at a time
+    BATCH_SIZE = 200
+
+    def __init__(self, parent, games, numbers=None):
         _Dialog.__init__(
             self,
             title="Select a Game",
             transient_for=parent,
             modal=True
         )
-        self.set_default_size(500, 300)
+        self.set_default_size(600, 400)
 
         # The area to which we can add the list of games in the file
         self.area = self.get_content_area()
 
-        # The games file
-        self.games_file = games
-
-        # The list of chess.dcn.Game instances
+        # The gameindex.GameIndex of the games in the file
         self.games = games
 
-        # The listbox for the games
-        self.listbox = Gtk.ListBox()
-        self.listbox.set_selection_mode(Gtk.SelectionMode.SINGLE)
-        self.listbox.connect("row-activated", self._on_row_activated)
-
-        self.listbox_box = Gtk.ScrolledWindow()
-        self.listbox_box.add(self.listbox)
-        self.area.pack_start(self.listbox_box, True, True, 0)
-
-        # The list of rows
-        self.rows = []
-
-        # Add the games to the listbox
-        for game in self.games:
-            row = Gtk.ListBoxRow()
-            self.rows.append(row)
-            row.game_instance = game
-            hbox = Gtk.HBox()
-            hbox.add(
-                Gtk.Label(
-                    label="%s vs. %s" % (game.headers["White"], game.headers["Black"])
-                )
-            )
-            hbox.show_all()
-            row.add(hbox)
-            self.listbox.add(row)
-
-        self.listbox.select_row(self.rows[0])
-        self.game_selected = self.games[0]
+        # The numbers of the games to choose from, and of those that match
+        # the filters
+        if numbers is not None:
+            self.all_numbers = list(numbers)
+            self.numbers = list(numbers)
+        else:
+            self.all_numbers = None
+            self.numbers = list(range(len(self.games)))
+
+        # The filters
+        self._create_filters()
+
+        # The list of games. The list store holds the game's number in the
+        # index and the headers shown; it is filled a batch at a time as the
+        # list is scrolled, and the tree view only creates the cells for the
+        # rows that are visible
+        self.game_store = Gtk.ListStore(int, str, str, str, str, str)
+        self.game_view = Gtk.TreeView(model=self.game_store)
+        self.game_view.set_fixed_height_mode(True)
+        for column_number, title in enumerate(("White", "Black", "Event", "Date", "Result")):
+            column = Gtk.TreeViewColumn(title, Gtk.CellRendererText(), text=column_number + 1)
+            column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+            column.set_fixed_width(100)
+            column.set_resizable(True)
+            self.game_view.append_column(column)
+        self.game_view.connect("row-activated", self._on_row_activated)
+
+        self.game_window = Gtk.ScrolledWindow()
+        self.game_window.connect("edge-reached", self._on_edge_reached)
+        self.game_window.add(self.game_view)
+        self.area.pack_start(self.game_window, True, True, 0)
+
+        # The number of games added to the list so far
+        self.games_loaded = 0
+        self._load_games()
+
+        # The number of the selected game
+        self.game_selected = None
+        if self.games_loaded > 0:
+            self.game_view.get_selection().select_path(Gtk.TreePath(0))
+            self.game_selected = self.numbers[0]
 
         # Add the buttons
         buttons = (
@@ -669,18 +681,124 @@ class GameSelectorDialog(_Dialog):
 
         self.show_all()
 
-    def _on_row_activated(self, listbox, row):
-        self.game_selected = row.game_instance
+    def _create_filter_entry(self, box, label, width):
+        """Pack a filter entry with LABEL into BOX, and return the entry."""
+        box.pack_start(Gtk.Label(label=label), False, False, 2)
+        entry = Gtk.Entry()
+        entry.set_width_chars(width)
+        entry.connect("activate", self._filter_games)
+        box.pack_start(entry, False, False, 2)
+        return entry
+
+    def _create_filters(self):
+        """Create the entries for filtering the games."""
+
+        # The player, event and ECO filters
+        self.filter_box = Gtk.HBox()
+        self.area.pack_start(self.filter_box, False, False, 2)
+        self.player_filter_entry = self._create_filter_entry(self.filter_box, "Player: ", 12)
+        self.event_filter_entry = self._create_filter_entry(self.filter_box, "Event: ", 12)
+        self.eco_filter_entry = self._create_filter_entry(self.filter_box, "ECO: ", 3)
+
+        # The date, result and ply count filters
+        self.filter_box2 = Gtk.HBox()
+        self.area.pack_start(self.filter_box2, False, False, 2)
+        self.date_from_filter_entry = self._create_filter_entry(self.filter_box2, "Date: ", 10)
+        self.date_from_filter_entry.set_placeholder_text("YYYY.MM.DD")
+        self.date_to_filter_entry = self._create_filter_entry(self.filter_box2, "to ", 10)
+        self.date_to_filter_entry.set_placeholder_text("YYYY.MM.DD")
+        self.filter_box2.pack_start(Gtk.Label(label="Result: "), False, False, 2)
+        self.result_filter_combo = Gtk.ComboBoxText()
+        for result in ("Any", "1-0", "0-1", "1/2-1/2", "*"):
+            self.result_filter_combo.append(result, result)
+        self.result_filter_combo.set_active_id("Any")
+        self.filter_box2.pack_start(self.result_filter_combo, False, False, 2)
+        self.min_plies_filter_entry = self._create_filter_entry(self.filter_box2, "Plies: ", 3)
+        self.max_plies_filter_entry = self._create_filter_entry(self.filter_box2, "to ", 3)
+
+        # The button to apply the filters
+        self.filter_button = Gtk.Button(label="Filter")
+        self.filter_button.connect("clicked", self._filter_games)
+        self.filter_box2.pack_end(self.filter_button, False, False, 2)
+
+    def _filter_games(self, *args):
+        """Show only the games that match the filters."""
+
+        # The ply counts, if they are numbers
+        try: min_plies = int(self.min_plies_filter_entry.get_text())
+        except ValueError:
+            min_plies = None
+        try: max_plies = int(self.max_plies_filter_entry.get_text())
+        except ValueError:
+            max_plies = None
+        result = self.result_filter_combo.get_active_id()
+        if result == "Any":
+            result = None
+
+        self.numbers = self.games.filter(
+            player=self.player_filter_entry.get_text().strip(),
+            event=self.event_filter_entry.get_text().strip(),
+            date_from=self.date_from_filter_entry.get_text().strip(),
+            date_to=self.date_to_filter_entry.get_text().strip(),
+            result=result,
+            eco=self.eco_filter_entry.get_text().strip(),
+            min_plies=min_plies,
+            max_plies=max_plies
+        )
+        if self.all_numbers is not None:
+            allowed = set(self.all_numbers)
+            self.numbers = [number for number in self.numbers if number in allowed]
+
+        # Fill the list again with the games that matched
+        self.game_store.clear()
+        self.games_loaded = 0
+        self._load_games()
+        self.game_selected = None
+        if self.games_loaded > 0:
+            self.game_view.get_selection().select_path(Gtk.TreePath(0))
+            self.game_selected = self.numbers[0]
+
+    def _load_games(self):
+        """Add the next batch of the games that match the filters to the list."""
+
+        headers = self.games.headers
+        end = min(self.games_loaded + self.BATCH_SIZE, len(self.numbers))
+        for number in self.numbers[self.games_loaded:end]:
+            self.game_store.append([
+                number,
+                headers["White"][number],
+                headers["Black"][number],
+                headers["Event"][number],
+                headers["Date"][number],
+                headers["Result"][number]
+            ])
+        self.games_loaded = end
+
+    def _on_edge_reached(self, window, position):
+        """Add more games to the list when it is scrolled to the bottom."""
+        if position == Gtk.PositionType.BOTTOM:
+            self._load_games()
+
+    def _on_row_activated(self, treeview, path, column):
+        self.game_selected = self.game_store[path][0]
+        self.response(Gtk.ResponseType.OK)
 
     def show_dialog(self):
         
         # Run us
         response = self.run()
+        model, treeiter = self.game_view.get_selection().get_selected()
+        if treeiter is not None:
+            self.game_selected = model[treeiter][0]
 
         # Destroy us
         self.destroy()
 
-        return response, self.game_selected
+        # Only the selected game gets parsed
+        if response == Gtk.ResponseType.OK and self.game_selected is not None:
+            return response, self.games.read_game(self.game_selected)
+        else:
+            return response, None
 
 class HeadersDialog(_Dialog):
     """The dialog in which users can edit the game's headers.
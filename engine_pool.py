@@ -0,0 +1,250 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""The engine pool, shared by all the game managers of the application."""
+
+import os
+import sys
+import threading
+import time
+
+import chess
+import chess.engine
+
+# The engine executable
+ENGINE_PATH = f"{os.path.dirname(__file__)}/stockfish"
+
+# The number of seconds an engine may be idle before it is shut down
+IDLE_TIMEOUT = 300
+
+class EnginePool:
+    """A pool of running engines, leased to the game managers on demand.
+
+    At most MAX_ENGINES engine processes are alive at a time. An owner that
+    leases an engine gets the engine it used last back if it is idle, so that
+    the engine still has the hash table of that owner's game. Engines that have
+    been idle for more than IDLE_TIMEOUT seconds are shut down by reap()."""
+
+    def __init__(self, max_engines=None, idle_timeout=IDLE_TIMEOUT, command=ENGINE_PATH):
+
+        # Stockfish searches with one thread by default, so by default we allow
+        # one engine for every two cores
+        if max_engines is None:
+            max_engines = max(1, (os.cpu_count() or 2) // 2)
+        self.max_engines = max_engines
+        self.idle_timeout = idle_timeout
+        self.command = command
+
+        # The lock guarding all the engine lists
+        self._condition = threading.Condition()
+
+        # All the live engines, the idle engines with the time they were
+        # released, and the owner each engine was leased to last
+        self._engines = []
+        self._idle = {}
+        self._owners = {}
+
+        # The number of engines currently being started, and how many of
+        # those are started in the background by prestart()
+        self._starting = 0
+        self._prestarting = 0
+
+        # Whether the pool has been closed
+        self._closed = False
+
+        # All the engines run on the event loop of one manager, instead of
+        # each starting a thread and event loop of its own
+        self._manager = chess.engine.EngineManager(name="EnginePool")
+
+    def _is_alive(self, engine):
+        """Return True if ENGINE's process is still running."""
+        return not engine.returncode.done()
+
+    def _prestart(self):
+        """Start an engine and add it to the idle engines. This runs in a
+        background thread."""
+
+        try:
+            engine = self._start_engine()
+        except Exception:
+            # Leasing will try again, and report the error then
+            engine = None
+
+        with self._condition:
+            self._starting -= 1
+            self._prestarting -= 1
+            if engine is not None and not self._closed:
+                self._engines.append(engine)
+                self._idle[engine] = time.monotonic()
+                engine = None
+            self._condition.notify_all()
+
+        if engine is not None:
+            self._quit_engine(engine)
+
+    def _quit_engine(self, engine):
+        """Shut down ENGINE, ignoring the errors of engines that are already gone."""
+        try:
+            engine.quit()
+        except Exception:
+            pass
+        engine.close()
+
+    def _remove(self, engine):
+        """Forget ENGINE. The lock must be held."""
+        self._engines.remove(engine)
+        self._idle.pop(engine, None)
+        self._owners.pop(engine, None)
+
+    def _start_engine(self):
+        """Start a new engine process. Set it as an executable if it is not
+        already."""
+
+        try:
+            return self._manager.popen_uci(self.command)
+        except PermissionError:
+
+            # Do this command only if the system is LINUX-related, just to be safe.
+            if "linux" in sys.platform.lower():
+                os.system(f"chmod +x {self.command}")
+                return self._manager.popen_uci(self.command)
+            else:
+                print("FATAL ERROR: Cannot set up engine: engine is not executable.")
+                print(f"Please set {self.command} to be executable.")
+                raise
+
+    def _take(self, engine, owner):
+        """Lease idle ENGINE to OWNER. The lock must be held."""
+        del self._idle[engine]
+        self._owners[engine] = owner
+        return engine
+
+    def close(self):
+        """Shut down all the engines. Leased engines are shut down as well."""
+
+        with self._condition:
+            self._closed = True
+            engines = self._engines
+            self._engines = []
+            self._idle = {}
+            self._owners = {}
+            self._condition.notify_all()
+        for engine in engines:
+            self._quit_engine(engine)
+        self._manager.close()
+
+    def discard(self, engine):
+        """Give back leased ENGINE because it is broken, and shut it down."""
+
+        with self._condition:
+            if engine in self._engines:
+                self._remove(engine)
+            self._condition.notify()
+        self._quit_engine(engine)
+
+    def lease(self, owner):
+        """Return an engine for OWNER to use, and give it back with release()
+        when done. Block while all the engines are leased and the pool is full.
+
+        Raises chess.engine.EngineTerminatedError if the pool is closed."""
+
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise chess.engine.EngineTerminatedError("engine pool closed")
+
+                # Drop the idle engines that have died
+                for engine in list(self._idle):
+                    if not self._is_alive(engine):
+                        self._remove(engine)
+
+                # Prefer the engine this owner used last, then the engine that
+                # has been idle the longest
+                for engine in self._idle:
+                    if self._owners.get(engine) is owner:
+                        return self._take(engine, owner)
+                if self._idle:
+                    return self._take(min(self._idle, key=self._idle.get), owner)
+
+                # Start a new engine if there is room for one, unless one is
+                # already on its way from prestart()
+                if (not self._prestarting and
+                    len(self._engines) + self._starting < self.max_engines):
+                    self._starting += 1
+                    break
+                self._condition.wait()
+
+        # Start the engine outside of the lock, because this takes a while
+        try:
+            engine = self._start_engine()
+        finally:
+            with self._condition:
+                self._starting -= 1
+                self._condition.notify()
+
+        with self._condition:
+            if not self._closed:
+                self._engines.append(engine)
+                self._owners[engine] = owner
+                return engine
+        self._quit_engine(engine)
+        raise chess.engine.EngineTerminatedError("engine pool closed")
+
+    def prestart(self):
+        """Start an engine in the background if there is none yet, so that the
+        first lease doesn't have to wait for the engine process to start and
+        for the UCI handshake."""
+
+        with self._condition:
+            if self._closed or self._engines or self._starting:
+                return
+            self._starting += 1
+            self._prestarting += 1
+
+        thread = threading.Thread(
+            target=self._prestart,
+            name="EnginePool prestart",
+            daemon=True
+        )
+        thread.start()
+
+    def reap(self):
+        """Shut down the engines that have been idle for longer than the idle
+        timeout. Return True, so that this can be used as a GLib timeout."""
+
+        now = time.monotonic()
+        with self._condition:
+            expired = [
+                engine for engine, released in self._idle.items()
+                if now - released > self.idle_timeout or not self._is_alive(engine)
+            ]
+            for engine in expired:
+                self._remove(engine)
+        for engine in expired:
+            self._quit_engine(engine)
+        return True
+
+    def release(self, engine):
+        """Give back leased ENGINE, so that it can be leased again."""
+
+        with self._condition:
+            if engine in self._engines:
+                self._idle[engine] = time.monotonic()
+            self._condition.notify()
@@ -21,22 +21,26 @@
 """The game manager."""
 
 import gi
-import os
 import random
-import sys
+import threading
 
 import chess
 import chess.engine
 import dialogs
+import engine_pool
 import messagedialogs
+import san_cache
 
 from constants import *
-from gi.repository import Gtk
+from gi.repository import GLib
+
+# The seconds to wait for a cancelled search to finish
+CANCEL_TIMEOUT = 5
 
 class Game:
     """The class that manages the chess game."""
 
-    def __init__(self):
+    def __init__(self, pool=None):
     
         # The last square that was clicked
         self.move_from = None
@@ -55,22 +59,152 @@ class Game:
         # The stack of undone moves
         self.undo_stack = []
 
+        # The SAN of the game's moves, shared by the status frames
+        self.san_cache = san_cache.SanCache()
+
         # The variable telling whether the game over dialogs have been aknowledged
         self.dialog_ok = False
 
-        # The chess engine. Set it as an executable if it is not already
+        # The engine's search. It runs in a background thread, so we keep the
+        # running analysis around to be able to stop it
+        self.analysis = None
+        self.engine_thinking = False
+        self.engine_moves_left = 0
+        self.engine_stop_requested = False
+        self.engine_quit = False
+
+        # The thread running the search, and the number of the search; the
+        # results of searches that have been cancelled are ignored
+        self.engine_thread = None
+        self.engine_search = 0
+
+        # The pool we lease the chess engine from. Without a shared pool, use
+        # a pool of our own with a single engine
+        if pool is not None:
+            self.engine_pool = pool
+            self.own_engine_pool = False
+        else:
+            self.engine_pool = engine_pool.EnginePool(max_engines=1)
+            self.own_engine_pool = True
+
+        # The engine leased from the pool, while it is searching
+        self.engine = None
+
+        # The key of the current game for the engine; the engine keeps its hash
+        # table as long as it searches positions with the same key
+        self.engine_game = object()
+
+    def _cancel_search(self):
+        """Stop the engine's running search and wait for it, discarding its
+        move. Use this before changing the game under the engine's feet."""
+
+        if not self.engine_thinking:
+            return
+
+        # Make the search's result stale before stopping it, so that its move
+        # is never played
+        self.engine_search += 1
+        self.engine_moves_left = 0
+        self.engine_stop_requested = True
+        self._stop_analysis()
+
+        # A search that is still waiting for an engine of a shared pool can't
+        # be interrupted; it stops as soon as it gets one, so don't block on it
+        self.engine_thread.join(CANCEL_TIMEOUT)
+        self.engine_thread = None
+        self.analysis = None
+        self.engine_thinking = False
+        self.status_function(thinking=False)
+
+    def _engine_search(self, board, limit, search):
+        """Search for the best move on BOARD. This runs in a background thread;
+        the result is handed back to the main thread with GLib.idle_add. SEARCH
+        is the number of the search, telling stale results apart."""
+
+        best = None
+        engine = None
+        error = None
         try:
-            self.engine = chess.engine.SimpleEngine.popen_uci(f"{ROOT_PATH}stockfish")
-        except PermissionError:
+            engine = self.engine_pool.lease(self)
+            if search == self.engine_search:
+                self.engine = engine
+
+            # Only the newest info of each search is of use to us, so let the
+            # engine coalesce the lines it sends ten times a second
+            analysis = engine.analysis(board, limit, game=self.engine_game, coalesce=0.1)
+            if search == self.engine_search:
+                self.analysis = analysis
+            if self.engine_stop_requested or search != self.engine_search:
+                analysis.stop()
+            best = analysis.wait()
+            self.engine_pool.release(engine)
+        except Exception as e:
+            error = e
+
+            # Give back an engine that failed; if the lease failed, there is
+            # no engine to give back
+            if engine is not None:
+                self.engine_pool.discard(engine)
+        finally:
+
+            # Always hand back to the main thread, or the game would think the
+            # engine is still searching
+            if search == self.engine_search:
+                self.engine = None
+            GLib.idle_add(self._engine_search_done, board, best, search, error)
+
+    def _engine_search_done(self, board, best, search, error=None):
+        """Play the engine's move BEST, found for BOARD, if the game is still
+        at the position the engine was searching. If the search failed with
+        ERROR, show the error instead."""
+
+        # Ignore searches that have been cancelled
+        if search != self.engine_search:
+            return False
+
+        self.engine_thread = None
+        self.analysis = None
+        self.engine_thinking = False
+
+        # Don't touch the window if it has been closed in the meantime
+        if self.engine_quit:
+            return False
+
+        # Hide the spinners
+        self.status_function(thinking=False)
+
+        if error is not None:
+            self.engine_moves_left = 0
+            self.show_engine_error(error)
+            self.update_status()
+            return False
 
-            # Do this command only if the system is LINUX-related, just to be safe.
-            if "linux" in sys.platform.lower():
-                os.system(f"chmod +x {ROOT_PATH}stockfish")
-                self.engine = chess.engine.SimpleEngine.popen_uci(f"{ROOT_PATH}stockfish")
-            else:
-                print("FATAL ERROR: Cannot set up engine: engine is not executable.")
-                print(f"Please set {ROOT_PATH}stockfish to be executable.")
-                exit()
+        # Discard the move if the game has changed in the meantime
+        if (best is None or best.move is None or
+            board.move_stack != self.board.move_stack or board.fen() != self.board.fen()):
+            self.engine_moves_left = 0
+            self.update_status()
+            return False
+
+        # Move the engine's move
+        self._push_move(best.move)
+
+        # Clear the undo stack
+        self.undo_stack = []
+
+        # Set the move_to setting so we can update the last-moved square
+        self.move_to = best.move.uci()[2:]
+        self.chessboard_function(board=self.board)
+
+        # Update the status labels
+        self.update_status()
+
+        # Start the next search, if we were asked for more than one move
+        self.engine_moves_left -= 1
+        if self.engine_moves_left > 0:
+            self.engine_move(self.engine_moves_left)
+
+        return False
 
     def _game_over(self):
         """Handle the status and dialogs for the game's end."""
@@ -139,6 +273,16 @@ class Game:
         
         self.chessboard_function(square_color=(square_name, color))
 
+    def _stop_analysis(self):
+        """Stop the engine's running search, if there is one."""
+
+        analysis = self.analysis
+        if analysis is not None:
+            try:
+                analysis.stop()
+            except chess.engine.EngineError:
+                pass
+
     def bind_chessboard(self, func):
         """Bind chessboard updates to a call of FUNC, giving parameters for it."""
         self.chessboard_function = func
@@ -147,48 +291,45 @@ class Game:
         """Bind status updates to a call of FUNC, giving parameters for game status."""
         self.status_function = func
 
-    def engine_move(self):
-        """Make the engine this turn."""
-
-        if not self.board.is_game_over():
-
-            # Set the spinner going
-            while Gtk.events_pending():
-                Gtk.main_iteration()
-
-            # Move the right time for the right turn
-            if self.board.turn:
-                limit = self.white_limit
-                self.status_function(thinking="white")
-            else:
-                limit = self.black_limit
-                self.status_function(thinking="black")
-
-            # Show the spinners
-            while Gtk.events_pending():
-                Gtk.main_iteration()
-
-            # Get the move from the engine
-            if limit == None:
-                engine_move = self.engine.play(self.board, chess.engine.Limit())
-            else:
-                engine_move = self.engine.play(self.board, limit)
-
-            # Move the engine's move
-            self._push_move(engine_move.move)
+    def engine_move(self, moves=1):
+        """Make the engine move for this turn, and for the MOVES - 1 turns after
+        it. The search runs in the background, so this returns immediately. A
+        search that is already running is cancelled first."""
 
-            # Clear the undo stack
-            self.undo_stack = []
+        self._cancel_search()
+        if moves < 1 or self.board.is_game_over():
+            return
 
-            # Set the move_to setting so we can update the last-moved square
-            self.move_to = engine_move.move.uci()[2:]
-            self.chessboard_function(board=self.board)
-
-            # Hide the spinners
-            self.status_function(thinking=False)
+        self.engine_moves_left = moves
+        self.engine_stop_requested = False
+        self.engine_thinking = True
+        self.engine_search += 1
 
-            # Update the status labels
-            self.update_status()
+        # Move the right time for the right turn, and show the spinners
+        if self.board.turn:
+            limit = self.white_limit
+            self.status_function(thinking="white")
+        else:
+            limit = self.black_limit
+            self.status_function(thinking="black")
+        if limit == None:
+            limit = chess.engine.Limit()
+
+        # Get the move from the engine
+        self.engine_thread = threading.Thread(
+            target=self._engine_search,
+            args=(self.board.copy(), limit, self.engine_search),
+            daemon=True
+        )
+        self.engine_thread.start()
+
+    def engine_stop(self):
+        """Stop the engine's search, making it play its best move so far."""
+
+        if self.engine_thinking:
+            self.engine_moves_left = 1
+            self.engine_stop_requested = True
+            self._stop_analysis()
 
     def get_game_status(self):
         """Return various status stuff about the game, like the number of each
@@ -209,6 +350,7 @@ class Game:
     def move_redo(self):
         """Redo the last undone move."""
         
+        self._cancel_search()
         try:
             if self.undo_stack != []:
                 move = self.undo_stack.pop()
@@ -233,6 +375,7 @@ class Game:
     def move_undo(self):
         """Undo the last move on the stack."""
         
+        self._cancel_search()
         try:
             move = self.board.pop()
             # Undo the game's move
@@ -253,8 +396,10 @@ class Game:
     def new_game(self, game=None):
         """Create a new game."""
 
-        # Reset the game
+        # Reset the game, and have the engine start on a clean hash table
+        self._cancel_search()
         self.board.reset()
+        self.engine_game = object()
 
         # Reset the chessboard
         self.chessboard_function(sensitive=True)
@@ -273,8 +418,10 @@ class Game:
     def new_game_from_pgn(self, game):
         """Create a new game from a chess.pgn.Game instance."""
 
-        # Reset the game
+        # Reset the game, and have the engine start on a clean hash table
+        self._cancel_search()
         self.board.reset()
+        self.engine_game = object()
 
         # Reset the chessboard
         self.chessboard_function(sensitive=True)
@@ -294,8 +441,10 @@ class Game:
     def new_game_from_fen(self, fen=None):
         """Create a new game from a fen string."""
 
-        # Reset the game
+        # Reset the game, and have the engine start on a clean hash table
+        self._cancel_search()
         self.board.reset()
+        self.engine_game = object()
 
         # Reset the chessboard
         self.chessboard_function(sensitive=True)
@@ -310,6 +459,15 @@ class Game:
         # Update the status
         self.update_status()
 
+    def quit(self):
+        """Stop any running search and shut down the engine."""
+
+        self.engine_quit = True
+        self.engine_stop_requested = True
+        self._stop_analysis()
+        if self.own_engine_pool:
+            self.engine_pool.close()
+
     def random_move(self):
         """Play a random move."""
 
@@ -332,7 +490,12 @@ class Game:
     def update_status(self):
         """Update the status labels."""
 
-        self.status_function(board=self.board, fen=self.board.fen(), turn=self.board.turn)
+        self.status_function(
+            board=self.board,
+            fen=self.board.fen(),
+            turn=self.board.turn,
+            san=self.san_cache.update(self.board)
+        )
 
         if self.board.is_game_over():
             self._game_over()
@@ -356,6 +519,9 @@ class Game:
     def promote_function(self, color="white"):
         return "q"
 
+    def show_engine_error(self, error):
+        pass
+
     def show_game_over(self):
         pass
 
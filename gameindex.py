@@ -0,0 +1,322 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""The game index, which lists the games in a file without parsing them."""
+
+import hashlib
+import os
+import sqlite3
+
+# The headers kept in the index, for listing and filtering the games
+HEADERS = ["Event", "Site", "Date", "Round", "White", "Black", "Result", "ECO"]
+
+# The values of the headers for games that don't have them
+HEADER_DEFAULTS = {
+    "Event": "?",
+    "Site": "?",
+    "Date": "????.??.??",
+    "Round": "?",
+    "White": "?",
+    "Black": "?",
+    "Result": "*",
+    "ECO": ""
+}
+
+# The version of the index files. Index files of another version are ignored
+# and written again
+INDEX_VERSION = "1"
+
+class GameIndex:
+    """The headers and the file offsets of the games in a file. The headers
+    are stored by column, one list per header. A game is only parsed when it
+    is read with read_game."""
+
+    def __init__(self, file=None, reader=None):
+
+        # The file the games are in
+        self.file = file
+
+        # The function that parses a game, called as READER(index, number)
+        self.reader = reader
+
+        # The offset and the number of plies of each game in the file
+        self.offsets = []
+        self.plies = []
+
+        # The headers of the games, by header name
+        self.headers = {header: [] for header in HEADERS}
+
+        # The lowercase headers, for searching; made on the first search
+        self.headers_lower = {}
+
+        # The known part of the dates, for filtering; made on the first filter
+        self.dates = []
+
+        # The positions reached in the games, by Zobrist hash, when they are
+        # kept in memory instead of in the index file
+        self.positions = None
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def _get_dates(self):
+        """Return the known part of each game's date, as made by _parse_date."""
+        if len(self.dates) != len(self.offsets):
+            self.dates = [_parse_date(date) for date in self.headers["Date"]]
+        return self.dates
+
+    def _get_index_file(self, index_dir):
+        """Return the path of our file's index file in INDEX_DIR."""
+        name = hashlib.sha1(os.path.abspath(self.file).encode()).hexdigest()
+        return os.path.join(index_dir, "%s.sqlite" % name)
+
+    def _get_lower(self, header):
+        """Return the column of HEADER in lowercase."""
+        if len(self.headers_lower.get(header, ())) != len(self.offsets):
+            self.headers_lower[header] = [value.lower() for value in self.headers[header]]
+        return self.headers_lower[header]
+
+    def _get_stamp(self):
+        """Return a string that changes whenever our file is changed."""
+        stat = os.stat(self.file)
+        return "%s:%s" % (stat.st_size, stat.st_mtime_ns)
+
+    def _is_current(self, info):
+        """Return True if INFO, the info table of an index file, is of this
+        version and was written for our file as it is now."""
+        return (info.get("version") == INDEX_VERSION and
+            info.get("stamp") == self._get_stamp())
+
+    def append(self, offset, headers, plies=0):
+        """Add the game at OFFSET in the file, with HEADERS and PLIES plies, to
+        the index."""
+        self.offsets.append(offset)
+        self.plies.append(plies)
+        for header, column in self.headers.items():
+            column.append(headers.get(header, HEADER_DEFAULTS[header]))
+
+    def close(self):
+        """Release what the index holds open; an index of a pgn or dcn holds
+        nothing open, so this does nothing."""
+        pass
+
+    def filter(self, player=None, event=None, date_from=None, date_to=None,
+        result=None, eco=None, min_plies=None, max_plies=None):
+        """Return the numbers of the games that match all the arguments given.
+        PLAYER and EVENT match any part of the headers, ignoring case; ECO
+        matches the start of the code. DATE_FROM and DATE_TO are dates in
+        "YYYY.MM.DD" format, or the start of one, like "2010" or "2010.05".
+        Dates are only compared as far as both are known, so "2010.??.??" is in
+        May 2010; games without a known year don't match a date."""
+
+        numbers = range(len(self.offsets))
+
+        # Go through the columns one at a time, only checking the games that
+        # matched the ones before
+        if player:
+            player = player.lower()
+            white = self._get_lower("White")
+            black = self._get_lower("Black")
+            numbers = [n for n in numbers if player in white[n] or player in black[n]]
+        if event:
+            event = event.lower()
+            column = self._get_lower("Event")
+            numbers = [n for n in numbers if event in column[n]]
+        date_from = _parse_date(date_from or "")
+        date_to = _parse_date(date_to or "")
+        if date_from:
+            column = self._get_dates()
+            numbers = [n for n in numbers
+                if column[n] and column[n] >= date_from[:len(column[n])]]
+        if date_to:
+            column = self._get_dates()
+            numbers = [n for n in numbers
+                if column[n] and column[n][:len(date_to)] <= date_to]
+        if result:
+            column = self.headers["Result"]
+            numbers = [n for n in numbers if column[n] == result]
+        if eco:
+            eco = eco.upper()
+            column = self.headers["ECO"]
+            numbers = [n for n in numbers if column[n].startswith(eco)]
+        if min_plies is not None:
+            column = self.plies
+            numbers = [n for n in numbers if column[n] >= min_plies]
+        if max_plies is not None:
+            column = self.plies
+            numbers = [n for n in numbers if column[n] <= max_plies]
+
+        return list(numbers)
+
+    def find_position(self, key, index_dir=None):
+        """Return a list of (number, ply) for each game that reaches the
+        position with the Zobrist hash KEY, or None if the positions haven't
+        been indexed yet, or our file has changed since they were."""
+
+        if self.positions is not None:
+            return list(self.positions.get(key, []))
+        if index_dir is None or type(self.file) != type(""):
+            return None
+        try:
+            connection = sqlite3.connect(self._get_index_file(index_dir))
+            try:
+                info = dict(connection.execute("SELECT key, value FROM info"))
+                if info.get("positions") != "1" or not self._is_current(info):
+                    return None
+                return connection.execute(
+                    "SELECT number, ply FROM positions WHERE hash = ? ORDER BY number",
+                    (_to_signed(key),)
+                ).fetchall()
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error):
+            return None
+
+    def get_headers(self, number):
+        """Return the indexed headers of game NUMBER as a dict."""
+        return {header: column[number] for header, column in self.headers.items()}
+
+    def keep_positions(self, positions):
+        """Keep POSITIONS, an iterable of (key, number, ply) for the positions
+        reached in the games, in memory."""
+        self.positions = {}
+        for key, number, ply in positions:
+            self.positions.setdefault(key, []).append((number, ply))
+
+    def load(self, index_dir):
+        """Load the index from our file's index file in INDEX_DIR. Returns True
+        if it was loaded, and False if there is no index file or the file has
+        changed since it was written."""
+
+        index_file = self._get_index_file(index_dir)
+        if not os.path.exists(index_file):
+            return False
+        try:
+            connection = sqlite3.connect(index_file)
+            try:
+                info = dict(connection.execute("SELECT key, value FROM info"))
+                if not self._is_current(info):
+                    return False
+                rows = connection.execute(
+                    "SELECT offset, plies, %s FROM games ORDER BY number"
+                    % ", ".join('"%s"' % header for header in HEADERS)
+                ).fetchall()
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error):
+            return False
+
+        # Store the rows by column
+        columns = list(zip(*rows)) or [()] * (len(HEADERS) + 2)
+        self.offsets = list(columns[0])
+        self.plies = list(columns[1])
+        for header, column in zip(HEADERS, columns[2:]):
+            self.headers[header] = list(column)
+        return True
+
+    def read_game(self, number):
+        """Parse and return game NUMBER."""
+        return self.reader(self, number)
+
+    def save(self, index_dir):
+        """Write the index to our file's index file in INDEX_DIR, so that the
+        next load doesn't have to read the file again. Fails silently if the
+        index file can't be written."""
+
+        index_file = self._get_index_file(index_dir)
+        temp_file = index_file + ".tmp"
+        try:
+            os.makedirs(index_dir, exist_ok=True)
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            connection = sqlite3.connect(temp_file)
+            try:
+                connection.execute("CREATE TABLE info (key TEXT PRIMARY KEY, value TEXT)")
+                connection.execute(
+                    "CREATE TABLE games (number INTEGER PRIMARY KEY, offset INTEGER, plies INTEGER, %s)"
+                    % ", ".join('"%s" TEXT' % header for header in HEADERS)
+                )
+                connection.executemany(
+                    "INSERT INTO info VALUES (?, ?)",
+                    (("version", INDEX_VERSION), ("stamp", self._get_stamp()))
+                )
+                connection.executemany(
+                    "INSERT INTO games VALUES (%s)" % ", ".join(["?"] * (len(HEADERS) + 3)),
+                    zip(
+                        range(len(self.offsets)),
+                        self.offsets,
+                        self.plies,
+                        *[self.headers[header] for header in HEADERS]
+                    )
+                )
+                connection.commit()
+            finally:
+                connection.close()
+            os.replace(temp_file, index_file)
+        except (OSError, sqlite3.Error):
+            pass
+
+    def save_positions(self, positions, index_dir):
+        """Write POSITIONS, an iterable of (key, number, ply) for the positions
+        reached in the games, to our file's index file in INDEX_DIR. Returns
+        True if they were written; the index file must have been saved first,
+        and our file must not have changed since."""
+
+        index_file = self._get_index_file(index_dir)
+        if type(self.file) != type("") or not os.path.exists(index_file):
+            return False
+        try:
+            connection = sqlite3.connect(index_file)
+            try:
+                info = dict(connection.execute("SELECT key, value FROM info"))
+                if not self._is_current(info):
+                    return False
+                connection.execute("DROP TABLE IF EXISTS positions")
+                connection.execute("CREATE TABLE positions (hash INTEGER, number INTEGER, ply INTEGER)")
+                connection.executemany(
+                    "INSERT INTO positions VALUES (?, ?, ?)",
+                    ((_to_signed(key), number, ply) for key, number, ply in positions)
+                )
+                connection.execute("CREATE INDEX positions_hash ON positions (hash)")
+                connection.execute("INSERT OR REPLACE INTO info VALUES ('positions', '1')")
+                connection.commit()
+            finally:
+                connection.close()
+        except (OSError, sqlite3.Error):
+            return False
+        return True
+
+def _parse_date(date):
+    """Return the known year, month and day of DATE, in "YYYY.MM.DD" format,
+    as a tuple of ints. The tuple stops at the first unknown part, so
+    "2010.??.??" gives (2010,) and "????.??.??" gives ()."""
+    parts = []
+    for part in date.split(".")[:3]:
+        if not part.isdigit():
+            break
+        parts.append(int(part))
+    return tuple(parts)
+
+def _to_signed(key):
+    """Return the 64-bit Zobrist hash KEY as a signed integer, like SQLite
+    stores it."""
+    if key >= 1 << 63:
+        return key - (1 << 64)
+    return key
@@ -21,34 +21,213 @@
 """Pgn-format game saving module for Schach."""
 
 import io
+import re
 import time
 
 import chess
 import chess.pgn
+import chess.polyglot
+import gameindex
 
-def load_file(file):
-    """Load the games from FILE."""
+# A header line
+TAG_REGEX = re.compile(rb"^\[([A-Za-z0-9_]+)\s+\"([^\r]*)\"\]\s*$")
+
+# The tokens of the movetext that are needed to count the plies of a game: the
+# moves, and the characters that start and end comments and variations
+PLY_REGEX = re.compile(rb"""
+    [NBKRQ]?[a-h]?[1-8]?[\-x]?[a-h][1-8](?:=?[nbrqkNBRQK])?
+    |[PNBRQK]?@[a-h][1-8]
+    |--|Z0|0000|@@@@
+    |O-O(?:-O)?|0-0(?:-0)?
+    |[{;()]
+    """, re.VERBOSE)
+
+class _PositionVisitor(chess.pgn.BaseVisitor):
+    """Collects the Zobrist hashes of the positions in a game's mainline."""
+
+    def begin_game(self):
+        self.keys = []
+
+    def begin_variation(self):
+        return chess.pgn.SKIP
+
+    def result(self):
+        return self.keys
+
+    def visit_board(self, board):
+        self.keys.append(chess.polyglot.zobrist_hash(board))
+
+def _index_games(handle, index):
+    """Add the offset, headers and number of plies of each game in HANDLE, a
+    file opened in binary mode, to INDEX. The moves are only counted, not
+    parsed."""
+
+    # The game being read
+    offset = None
+    headers = {}
+    plies = 0
+
+    # Where we are in the game's movetext
+    in_movetext = False
+    in_comment = False
+    depth = 0
+
+    while True:
+        line_offset = handle.tell()
+        line = handle.readline()
+        if not line:
+            break
+
+        # A header; the first header after the movetext starts the next game
+        if not in_comment and line.lstrip(b"\xef\xbb\xbf").startswith(b"["):
+            if offset is None or in_movetext:
+                if offset is not None:
+                    index.append(offset, headers, plies)
+                offset = line_offset
+                headers = {}
+                plies = 0
+                in_movetext = False
+                depth = 0
+            match = TAG_REGEX.match(line.lstrip(b"\xef\xbb\xbf"))
+            if match is not None:
+                headers[match.group(1).decode()] = match.group(2).decode("utf-8", "replace")
+            continue
+        if line.startswith(b"%"):
+            continue
+
+        # An empty line ends the movetext, like it does for chess.pgn
+        if not line.strip():
+            if in_movetext and not in_comment:
+                index.append(offset, headers, plies)
+                offset = None
+                in_movetext = False
+            continue
+
+        # Movetext without headers starts a game of its own
+        if offset is None:
+            offset = line_offset
+            headers = {}
+            plies = 0
+            depth = 0
+        in_movetext = True
+
+        # Count the moves that aren't in comments or variations
+        position = 0
+        if in_comment:
+            position = line.find(b"}")
+            if position == -1:
+                continue
+            position += 1
+            in_comment = False
+        while True:
+            match = PLY_REGEX.search(line, position)
+            if match is None:
+                break
+            token = match.group(0)
+            position = match.end()
+            if token == b"{":
+                position = line.find(b"}", position)
+                if position == -1:
+                    in_comment = True
+                    break
+                position += 1
+            elif token == b";":
+                break
+            elif token == b"(":
+                depth += 1
+            elif token == b")":
+                depth = max(depth - 1, 0)
+            elif depth == 0:
+                plies += 1
+
+    if offset is not None:
+        index.append(offset, headers, plies)
+
+def _read_game_data(handle, index, number):
+    """Return the text of game NUMBER of INDEX from HANDLE, a file opened in
+    binary mode."""
+
+    # The game ends where the next one starts
+    start = index.offsets[number]
+    if number + 1 < len(index):
+        size = index.offsets[number + 1] - start
+    else:
+        size = -1
+    handle.seek(start)
+    return handle.read(size).decode("utf-8", "replace")
+
+def _read_positions(index):
+    """Replay the mainline of each game in INDEX, and yield (key, number, ply)
+    for each position reached, KEY being the position's Zobrist hash. Each
+    position is only given once per game, at the first ply it is reached."""
+
+    if type(index.file) == type(""):
+        handle = open(index.file, "rb")
+    else:
+        handle = index.file
+    try:
+        for number in range(len(index)):
+            data = _read_game_data(handle, index, number)
+            keys = chess.pgn.read_game(io.StringIO(data), Visitor=_PositionVisitor)
+            seen = set()
+            for ply, key in enumerate(keys or []):
+                if key not in seen:
+                    seen.add(key)
+                    yield key, number, ply
+    finally:
+        if handle is not index.file:
+            handle.close()
+
+def find_position(index, board, index_dir=None):
+    """Return a list of (number, ply) for each game in INDEX that reaches the
+    position on BOARD. The first search replays all the games to index their
+    positions; the positions are kept in INDEX_DIR if it is given, so later
+    searches are just a lookup."""
+
+    key = chess.polyglot.zobrist_hash(board)
+    found = index.find_position(key, index_dir)
+    if found is None:
+        if index_dir is None or not index.save_positions(_read_positions(index), index_dir):
+            index.keep_positions(_read_positions(index))
+        found = index.find_position(key, index_dir)
+    return found
+
+def load_file(file, index_dir=None):
+    """Index the games in FILE, reading only their headers and counting their
+    moves. Returns a gameindex.GameIndex; its read_game method parses a single
+    game. If INDEX_DIR is given, the index is kept there, and reused as long as
+    FILE doesn't change."""
 
     # Check the file's type before reading it
     if type(file) == type(""):
-        with open(file) as f:
-            games = f.read()
+        index = gameindex.GameIndex(file, read_game)
+        if index_dir is not None and index.load(index_dir):
+            return index
+        with open(file, "rb") as f:
+            _index_games(f, index)
+            f.close()
+        if index_dir is not None:
+            index.save(index_dir)
+    else:
+
+        # Index text files from memory
+        if isinstance(file, io.TextIOBase):
+            file = io.BytesIO(file.read().encode())
+        index = gameindex.GameIndex(file, read_game)
+        _index_games(file, index)
+
+    return index
+
+def read_game(index, number):
+    """Parse game NUMBER of INDEX, and return it as a chess.pgn.Game."""
+
+    if type(index.file) == type(""):
+        with open(index.file, "rb") as f:
+            data = _read_game_data(f, index, number)
             f.close()
     else:
-        games = file.read()
-        file.close()
-
-    # Separate the games in the string, and add a chess.dcn.Game instance to
-    # the game_list for each game
-    game_list = []
-    games = games.split("\n\n\n")
-    for game in games:
-        if game != "":
-            pgn_game = chess.pgn.read_game(io.StringIO(game))
-            if pgn_game is not None:
-                game_list.append(pgn_game)
-
-    return game_list
+        data = _read_game_data(index.file, index, number)
+    return chess.pgn.read_game(io.StringIO(data))
 
 def save_game(game, file):
     """Save GAME to FILE in pgn format."""
@@ -0,0 +1,69 @@
+# Schach is a basic chess application that uses the Stockfish chess engine.
+# Copyright (C) 2021  Samuel Matzko
+
+# This file is part of Schach.
+
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 3 of the License, or
+# (at your option) any later version.
+
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA
+# or see <http://www.gnu.org/licenses/>
+
+"""The SAN cache, shared by everything that shows or exports the moves of a game."""
+
+class SanCache:
+    """The SAN of each move of a game. Each move's SAN is only computed once;
+    when moves are taken back, only the SAN of those moves is thrown away."""
+
+    def __init__(self):
+
+        # The position the moves were played from, and the moves
+        self.root_fen = None
+        self.moves = []
+
+        # The SAN of each of the moves
+        self.san = []
+
+    def clear(self):
+        """Forget all the moves."""
+        self.root_fen = None
+        self.moves = []
+        self.san = []
+
+    def update(self, board):
+        """Bring the cache up to date with the moves played on BOARD, and
+        return the list of their SAN."""
+
+        # Find how many of the cached moves are still played
+        root_fen = board.root().fen()
+        same = 0
+        if root_fen == self.root_fen:
+            for old_move, move in zip(self.moves, board.move_stack):
+                if old_move != move:
+                    break
+                same += 1
+
+        # Throw away the moves that were taken back
+        del self.moves[same:]
+        del self.san[same:]
+
+        # Go back to the first new move and add the new moves' SAN
+        if same < len(board.move_stack):
+            board2 = board.copy()
+            while len(board2.move_stack) > same:
+                board2.pop()
+            for move in board.move_stack[same:]:
+                self.moves.append(move)
+                self.san.append(board2.san(move))
+                board2.push(move)
+        self.root_fen = root_fen
+        return self.san
@@ -23,6 +23,7 @@
 import gi
 
 import chess
+import san_cache
 
 gi.require_version("Gdk", "3.0")
 gi.require_version("Gtk", "3.0")
@@ -77,28 +78,6 @@ class _PieceLabel(Gtk.HBox):
 
         self.show_all()
 
-class _Row(Gtk.ListBoxRow):
-    """The base class for the move listbox rows."""
-
-    def __init__(self, *args, move="MOVE", index=0, **kwargs):
-        Gtk.ListBoxRow.__init__(self, *args, **kwargs)
-
-        # The move to display in the label, and the move's index in the board's
-        # move stack
-        self.move = move
-        self.index = index
-
-        # The main box
-        self.box = Gtk.HBox()
-        self.add(self.box)
-
-        # The label
-        self.label = Gtk.Label(label=move)
-        self.box.pack_start(self.label, True, True, 0)
-
-        self.show_all()
-        self.box.show_all()
-
 class _StatusFrame(Gtk.Frame):
     """The base class for the status frames."""
 
@@ -112,12 +91,17 @@ class _StatusFrame(Gtk.Frame):
         self.box = Gtk.VBox()
         self.add(self.box)
 
-        # The list of listbox rows
-        self.rows = []
-
         # The number of moves played at the point displayed in the listbox
         self.moves_so_far = 0
 
+        # The SAN of the moves shown in the listbox, and the side that played
+        # the first of them, to compare against on the next update
+        self.san = []
+        self.first_turn = None
+
+        # The SAN cache to use when set_status isn't given the game's one
+        self.san_cache = san_cache.SanCache()
+
         # Set all the variables depending on the color
         if self.color == "white":
             
@@ -166,12 +150,21 @@ class _StatusFrame(Gtk.Frame):
         else:
             self.status_label_box.pack_start(self.status_label, False, False, 5)
 
-        # The move listbox and it's ScrolledWindow
+        # The move list and it's ScrolledWindow. The list store holds the
+        # move's SAN and the move's index in the board's move stack; the tree
+        # view only creates the cells for the rows that are visible
         self.move_window = Gtk.ScrolledWindow()
         self.box.pack_start(self.move_window, True, True, 0)
-        self.move_listbox = Gtk.ListBox()
-        self.move_listbox.connect("event", self._event_handler)
-        self.move_window.add(self.move_listbox)
+        self.move_store = Gtk.ListStore(str, int)
+        self.move_view = Gtk.TreeView(model=self.move_store)
+        self.move_view.set_headers_visible(False)
+        self.move_view.set_fixed_height_mode(True)
+        self.move_column = Gtk.TreeViewColumn("Move", Gtk.CellRendererText(xalign=0.5), text=0)
+        self.move_column.set_sizing(Gtk.TreeViewColumnSizing.FIXED)
+        self.move_column.set_expand(True)
+        self.move_view.append_column(self.move_column)
+        self.move_view.connect("row-activated", self._row_activated)
+        self.move_window.add(self.move_view)
 
         # The separator
         self.separator = Gtk.Separator(orientation=Gtk.Orientation.HORIZONTAL)
@@ -191,17 +184,18 @@ class _StatusFrame(Gtk.Frame):
 
         self.show_all()
 
-    def _event_handler(self, listbox, event):
-        if event.type == Gdk.EventType.DOUBLE_BUTTON_PRESS:
-            index = self.move_listbox.get_selected_row().index
-            self.undo_to_move_function(index)
+    def _row_activated(self, treeview, path, column):
+        """Undo to the move of the row that was double-clicked."""
+        index = self.move_store[path][1]
+        self.undo_to_move_function(index)
 
     def bind_undo_to_move(self, func):
         """Bind a row-item double-click to a call of FUNC."""
         self.undo_to_move_function = func
 
-    def set_status(self, board=None, thinking=None, check=None, we_won=None):
-        """Set the status of the labels based on the information given."""
+    def set_status(self, board=None, thinking=None, check=None, we_won=None, san=None):
+        """Set the status of the labels based on the information given. SAN is
+        the list of the SAN of BOARD's moves, if it is already known."""
 
         # The board
         if self.color == "white":
@@ -224,21 +218,39 @@ class _StatusFrame(Gtk.Frame):
             self.knight_label.label.set_label(str(str(board).count(n)))
             self.pawn_label.label.set_label(str(str(board).count(p)))
 
-            # Set the move listbox
-            board2 = chess.Board()
-            for row in self.rows:
-                self.move_listbox.remove(row)
-            self.rows = []
-            self.moves_so_far = 0
-            for move in board.move_stack:
-                if (board2.turn and self.color == "white" or
-                    not board2.turn and self.color == "black"):
-                    row = _Row(move=board2.san(move), index=self.moves_so_far)
-                    self.rows.append(row)
-                    self.move_listbox.insert(row, 0)
+            # The SAN of the moves, from the game's cache if we were given it
+            if san is None:
+                san = self.san_cache.update(board)
+
+            # The side that played the first move
+            if len(san) % 2 == 0:
+                first_turn = board.turn
+            else:
+                first_turn = not board.turn
+
+            # Find how many of the moves in the listbox are still played
+            same = 0
+            if first_turn == self.first_turn:
+                for old_san, new_san in zip(self.san, san):
+                    if old_san != new_san:
+                        break
+                    same += 1
+
+            # Remove the rows for the moves that were taken back. The newest
+            # moves are at the top
+            while len(self.move_store) > 0 and self.move_store[0][1] >= same:
+                self.move_store.remove(self.move_store.get_iter_first())
+
+            # Add the rows for the new moves
+            for index in range(same, len(san)):
+                turn = first_turn if index % 2 == 0 else not first_turn
+                if (turn and self.color == "white" or
+                    not turn and self.color == "black"):
+                    self.move_store.insert(0, [san[index], index])
                     self.move_window.do_scroll_child(self.move_window, Gtk.ScrollType.START, False)
-                self.moves_so_far += 1
-                board2.push(move)
+            self.first_turn = first_turn
+            self.san = list(san)
+            self.moves_so_far = len(san)
         if thinking is not None:
             if thinking:
                 self.king_label.spinner.start()
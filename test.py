@@ -21,21 +21,35 @@
 """Schach test suite."""
 
 import chess
+import chess.archive
 import chess.dcn
+import chess.engine
 import chess.pgn
+import chess.polyglot
 import gi
 import io
 import json
+import os
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
+import analysis
+import annotate
+import archive
 import dcn
+import engine_pool
 import game
+import gameindex
 import pgn
+import san_cache
 
 gi.require_version("Gtk", "3.0")
 
 from constants import *
-from gi.repository import Gtk
+from gi.repository import GLib, Gtk
 
 BOARD_FEN = "2b4r/p3p1pp/1p2q3/Q1pn2kP/2bPnp2/1P5p/P1PrBP1P/RN2KBNR"
 FEN = "2b4r/p3p1pp/1p2q3/Q1pn2kP/2bPnp2/1P5p/P1PrBP1P/RN2KBNR w KQkq - 0 1"
@@ -43,7 +57,8 @@ CHECKMATE = "4k3/8/8/8/8/8/1r6/Kq6 w KQkq - 0 67"
 STATUS_LIST = {
     "board": "r n b q k b n r\np p p p p p p p\n. . . . . . . .\n. . . . . . . .\n. . . . . . . .\n. . . . . . . .\nP P P P P P P P\nR N B Q K B N R",
     "fen": "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
-    "turn": True
+    "turn": True,
+    "san": []
 }
 DCN_FILE = """<game><header name="Event">A Test</header><header name="Site">This computer</header><header name="Date">1234.56.78</header><header name="Round">8</header><header name="White">A fake person</header><header name="Black">Dummy D. Dude</header><header name="Result">1-0</header><board fen="rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1" /><stack><move>a2a3</move><move>b8a6</move><move>e2e4</move></stack></game>\n\n\n"""
 PGN_FILE = """[Event "A Test"]
@@ -55,10 +70,252 @@ PGN_FILE = """[Event "A Test"]
 [Result "1-0"]
 
 1. a3 Na6 2. e4 1-0\n\n\n"""
+# A UCI engine that sends the info lines given as its first argument for each
+# search; it only sends its best move when stopped, unless its second argument
+# is "bestmove"
+FAKE_ENGINE = """
+import json, sys
+lines = json.loads(sys.argv[1])
+searching = False
+for command in sys.stdin:
+    command = command.split()
+    if command == ["uci"]:
+        print("id name Fake")
+        print("option name MultiPV type spin default 1 min 1 max 500")
+        print("uciok")
+    elif command == ["isready"]:
+        print("readyok")
+    elif command[:1] == ["go"]:
+        for line in lines:
+            print(line)
+        searching = sys.argv[2:] != ["bestmove"]
+        if not searching:
+            print("bestmove e2e4")
+    elif command == ["stop"] and searching:
+        searching = False
+        print("bestmove e2e4")
+    elif command == ["quit"]:
+        break
+    sys.stdout.flush()
+"""
 chessboard_method_tested = False
 promote_method_tested = False
 status_method_tested = False
 
+class AnalysisTestCase(unittest.TestCase):
+    """Tests for the batch analysis (analysis.BatchAnalysis)."""
+
+    def test_analyse_games(self):
+        """Test that each position of each game is analysed, in order."""
+
+        board = chess.Board()
+        board.push_uci("f2f3")
+        board.push_uci("e7e5")
+        board.push_uci("g2g4")
+        games = list(analysis.analyse_games([board, chess.Board()], chess.engine.Limit(depth=4), engines=2))
+        self.assertEqual([len(infos) for infos in games], [4, 1])
+        self.assertEqual(games[0][3]["score"].relative, chess.engine.Mate(1))
+        self.assertEqual(len(board.move_stack), 3)
+
+    def test_analyse_error(self):
+        """Test that an engine that can't be started raises instead of leaving
+        the analysis waiting."""
+
+        pool = engine_pool.EnginePool(max_engines=1, command="/nonexistent/stockfish")
+        batch = analysis.BatchAnalysis(chess.engine.Limit(depth=1), engines=2, pool=pool)
+        self.assertEqual(batch.engines, 1)
+        self.assertRaises(OSError, list, batch.analyse([chess.Board()]))
+        self.assertRaises(OSError, batch.analyse_game, chess.Board())
+        pool.close()
+
+    def test_engines_invalid(self):
+        """Test that an analysis without engines is refused up front."""
+
+        limit = chess.engine.Limit(depth=1)
+        self.assertRaises(ValueError, analysis.BatchAnalysis, limit, engines=0)
+        self.assertRaises(ValueError, analysis.BatchAnalysis, limit, engines=-1)
+        pool = engine_pool.EnginePool(max_engines=0)
+        self.assertRaises(ValueError, analysis.BatchAnalysis, limit, pool=pool)
+        pool.close()
+
+    def test_get_positions(self):
+        """Test that the positions of a game are listed from the start."""
+
+        board = chess.Board()
+        board.push_uci("e2e4")
+        board.push_uci("e7e5")
+        boards = analysis.get_positions(board)
+        self.assertEqual([len(position.move_stack) for position in boards], [0, 1, 2])
+        self.assertEqual(boards[2], board)
+
+class AnnotateTestCase(unittest.TestCase):
+    """Tests for the game annotation (annotate)."""
+
+    def test_annotate_game(self):
+        """Test that each move gets the evaluation after it, and that a move
+        that allows mate is marked as a blunder."""
+
+        board = chess.Board()
+        board.push_uci("f2f3")
+        board.push_uci("e7e5")
+        board.push_uci("g2g4")
+        with analysis.BatchAnalysis(chess.engine.Limit(depth=6), engines=2) as batch:
+            game = annotate.annotate_game(batch, board, {"White": "A fake person"})
+        self.assertEqual(game.headers["White"], "A fake person")
+        moves = list(game.mainline())
+        self.assertEqual([node.move for node in moves], board.move_stack)
+        self.assertEqual(moves[2].eval().white(), chess.engine.Mate(-1))
+        self.assertIn(chess.pgn.NAG_BLUNDER, moves[2].nags)
+
+        # The move that mates gets a mate in 0
+        board.push_uci("d8h4")
+        with analysis.BatchAnalysis(chess.engine.Limit(depth=6), engines=2) as batch:
+            game = annotate.annotate_game(batch, board)
+        self.assertEqual(game.end().comment, "[%eval #0]")
+
+    def test_get_nag(self):
+        """Test the NAGs for the centipawns lost by a move."""
+        self.assertEqual(annotate.get_nag(20), None)
+        self.assertEqual(annotate.get_nag(50), chess.pgn.NAG_DUBIOUS_MOVE)
+        self.assertEqual(annotate.get_nag(150), chess.pgn.NAG_MISTAKE)
+        self.assertEqual(annotate.get_nag(1000), chess.pgn.NAG_BLUNDER)
+
+    def test_main_engines(self):
+        """Test that the command line refuses to run without engines."""
+        self.assertRaises(SystemExit, annotate.main, ["-e", "0", "games.pgn"])
+
+class EngineManagerTestCase(unittest.TestCase):
+    """Tests for the engines sharing one event loop (chess.engine.EngineManager)."""
+
+    def create_engine(self, manager):
+        """Start the fake engine on MANAGER, and return it."""
+        return manager.popen_uci([sys.executable, "-c", FAKE_ENGINE, "[]"])
+
+    def test_close(self):
+        """Test that closing the manager shuts down its engines, even while
+        they are searching, and stops the event loop."""
+
+        manager = chess.engine.EngineManager()
+        engines = [self.create_engine(manager) for x in range(2)]
+        analysis = engines[0].analysis(chess.Board())
+        manager.close()
+        for engine in engines:
+            self.assertTrue(engine.returncode.done())
+        self.assertFalse(manager._thread.is_alive())
+        self.assertRaises(chess.engine.EngineTerminatedError, self.create_engine, manager)
+        self.assertRaises(chess.engine.EngineTerminatedError, analysis.wait)
+
+    def test_popen_failure(self):
+        """Test that an engine that can't be started is cleaned up, and that
+        the manager can still start other engines."""
+
+        manager = chess.engine.EngineManager()
+        try:
+            self.assertRaises(OSError, manager.popen_uci, "/nonexistent/stockfish")
+            self.assertRaises(chess.engine.EngineTerminatedError, manager.popen_uci, [sys.executable, "-c", "pass"])
+            engine = self.create_engine(manager)
+            self.assertEqual(engine.ping(), None)
+            for x in range(100):
+                if len(manager._watchers) == 1:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(list(manager._watchers), [engine])
+        finally:
+            manager.close()
+        self.assertFalse(manager._thread.is_alive())
+
+    def test_watch(self):
+        """Test that an engine that exits is reaped and forgotten by the
+        manager."""
+
+        with chess.engine.EngineManager() as manager:
+            engine = self.create_engine(manager)
+            engine.quit()
+            self.assertEqual(engine.returncode.result(timeout=10), 0)
+            for x in range(100):
+                if manager._watchers == {}:
+                    break
+                time.sleep(0.05)
+            self.assertEqual(manager._watchers, {})
+
+class EnginePoolTestCase(unittest.TestCase):
+    """Tests for the engine pool (engine_pool.EnginePool)."""
+
+    def test_discard(self):
+        """Test that a discarded engine is shut down and never leased again."""
+
+        pool = engine_pool.EnginePool(max_engines=1)
+        try:
+            engine = pool.lease(self)
+            pool.discard(engine)
+            self.assertIsNot(pool.lease(self), engine)
+            engine.returncode.result(timeout=10)
+        finally:
+            pool.close()
+
+    def test_lease_max_engines(self):
+        """Test that leasing waits for a free engine when the pool is full."""
+
+        pool = engine_pool.EnginePool(max_engines=1)
+        try:
+            engine = pool.lease(self)
+            leased = []
+            thread = threading.Thread(target=lambda: leased.append(pool.lease(object())))
+            thread.start()
+            thread.join(0.5)
+            self.assertEqual(leased, [])
+            pool.release(engine)
+            thread.join(10)
+            self.assertEqual(leased, [engine])
+        finally:
+            pool.close()
+
+    def test_lease_owner(self):
+        """Test that an owner gets the engine it used last back."""
+
+        owner = object()
+        owner2 = object()
+        pool = engine_pool.EnginePool(max_engines=2)
+        try:
+            engine = pool.lease(owner)
+            engine2 = pool.lease(owner2)
+            self.assertIsNot(engine, engine2)
+            pool.release(engine)
+            pool.release(engine2)
+            self.assertIs(pool.lease(owner2), engine2)
+            self.assertIs(pool.lease(owner), engine)
+        finally:
+            pool.close()
+        self.assertRaises(chess.engine.EngineTerminatedError, pool.lease, owner)
+
+    def test_prestart(self):
+        """Test that leasing uses the engine started by prestart instead of
+        starting another one."""
+
+        pool = engine_pool.EnginePool(max_engines=2)
+        try:
+            pool.prestart()
+            engine = pool.lease(self)
+            self.assertEqual(pool._engines, [engine])
+        finally:
+            pool.close()
+
+    def test_reap(self):
+        """Test that idle engines are shut down after the idle timeout, and
+        that leased engines are kept."""
+
+        pool = engine_pool.EnginePool(max_engines=2, idle_timeout=0)
+        try:
+            engine = pool.lease(self)
+            engine2 = pool.lease(object())
+            pool.release(engine)
+            time.sleep(0.01)
+            self.assertTrue(pool.reap())
+            self.assertEqual(pool._engines, [engine2])
+            engine.returncode.result(timeout=10)
+        finally:
+            pool.close()
+
 class GameManagerTest(unittest.TestCase):
     """Tests for the Schach game manager (game.Game)."""
 
@@ -74,7 +331,7 @@ class GameManagerTest(unittest.TestCase):
     def test_bind_and_initialize(self):
         """Test the class's initialization and method binding."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         game_manager.update_status()
         game_manager.promote_function = self.test_promote_function
         game_manager.bind_chessboard(self.test_chessboard_function)
@@ -92,12 +349,52 @@ class GameManagerTest(unittest.TestCase):
         global status_method_tested
         game_manager = self.create_game_manager_instance()
         game_manager.engine_move()
-        game_manager.engine.quit()
+        game_manager.quit()
+
+    def test_engine_new_game_while_searching(self):
+        """Test that a new game cancels the engine's running search."""
+        game_manager = self.create_game_manager_instance()
+        game_manager.white_limit = chess.engine.Limit(time=30)
+        game_manager.engine_move()
+        thread = game_manager.engine_thread
+        game_manager.new_game()
+        self.assertFalse(game_manager.engine_thinking)
+        self.assertFalse(thread.is_alive())
+
+        # The cancelled search's move must not be played
+        context = GLib.MainContext.default()
+        while context.iteration(False):
+            pass
+        self.assertEqual(game_manager.board.move_stack, [])
+
+        # The engine can search the new game right away
+        game_manager.white_limit = chess.engine.Limit(depth=1)
+        game_manager.engine_move()
+        while game_manager.engine_thinking:
+            context.iteration(True)
+        self.assertEqual(len(game_manager.board.move_stack), 1)
+        game_manager.quit()
+
+    def test_engine_stop(self):
+        """Test that engine_stop makes the engine play its best move so far."""
+        game_manager = self.create_game_manager_instance()
+        game_manager.white_limit = chess.engine.Limit(time=30)
+        game_manager.engine_move()
+        while game_manager.analysis is None:
+            time.sleep(0.01)
+        game_manager.engine_stop()
+        game_manager.engine_thread.join(10)
+        self.assertFalse(game_manager.engine_thread.is_alive())
+        context = GLib.MainContext.default()
+        while game_manager.engine_thinking:
+            context.iteration(True)
+        self.assertEqual(len(game_manager.board.move_stack), 1)
+        game_manager.quit()
 
     def test_method_binding(self):
         """Test the method binding for the game manager."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         game_manager.bind_chessboard(self.bound_method)
         self.assertEqual(game_manager.chessboard_function, self.bound_method)
         game_manager.bind_status(self.bound_method)
@@ -106,7 +403,7 @@ class GameManagerTest(unittest.TestCase):
     def test_move_redo(self):
         """Test the move_redo method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         game_manager._push_move(chess.Move.from_uci("a2a3"))
         game_manager.move_undo()
         # board_stack = game_manager.board.move_stack
@@ -121,7 +418,7 @@ class GameManagerTest(unittest.TestCase):
     def test_move_undo(self):
         """Test the move_undo method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         board_stack = game_manager.board.move_stack
         game_manager._push_move(chess.Move.from_uci("a2a3"))
         self.assertEqual(game_manager.board.move_stack, [chess.Move.from_uci("a2a3")])
@@ -133,7 +430,7 @@ class GameManagerTest(unittest.TestCase):
     def test_new_game(self):
         """Test the new_game method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         game_manager._push_move(chess.Move.from_uci("a2a3"))
         game_manager.new_game()
         self.assertEqual(game_manager.undo_stack, [])
@@ -142,7 +439,7 @@ class GameManagerTest(unittest.TestCase):
     def test_new_game_from_dcn(self):
         """Test the new_game method, but give an argument."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         dcn_game = chess.dcn.Game().from_file("%ssamples/game.dcn" % ROOT_PATH)
         game_manager.new_game(dcn_game)
         board = chess.Board()
@@ -154,7 +451,7 @@ class GameManagerTest(unittest.TestCase):
     def test_new_game_from_fen(self):
         """Test the new_game_from_fen method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         board = chess.Board(BOARD_FEN)
         game_manager.new_game_from_fen(BOARD_FEN)
         self.assertEqual(str(game_manager.board), str(board))
@@ -162,7 +459,7 @@ class GameManagerTest(unittest.TestCase):
     def test_new_game_from_pgn(self):
         """Test the new_game_from_pgn method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         with open("%ssamples/game.pgn" % ROOT_PATH) as f:
             pgn_game = chess.pgn.read_game(f)
             f.close()
@@ -183,7 +480,7 @@ class GameManagerTest(unittest.TestCase):
     def test_push_move(self):
         """Test the _push_move method."""
         game_manager = self.create_game_manager_instance()
-        game_manager.engine.quit()
+        game_manager.quit()
         move = chess.Move.from_uci("a2a3")
         game_manager._push_move(move)
         self.assertEqual(game_manager.board.move_stack, [move])
@@ -207,6 +504,20 @@ class GameSaverTestCase(unittest.TestCase):
         board.push_uci("e2e4")
         return board
 
+    def test_dcn_from_board(self):
+        """Test that making a dcn game from a board leaves the board as it was,
+        and that games where black moves first start with a null move."""
+
+        board = chess.Board("4k3/P7/8/8/8/8/8/4K3 b - - 0 1")
+        board.push_uci("e8d7")
+        board.push_uci("a7a8q")
+        fen = board.fen()
+        game_instance = chess.dcn.Game().from_board(board)
+        self.assertEqual(board.fen(), fen)
+        self.assertEqual(len(board.move_stack), 2)
+        self.assertEqual(game_instance.start_fen, "4k3/P7/8/8/8/8/8/4K3 b - - 0 1")
+        self.assertEqual([move.uci() for move in game_instance.moves], ["0000", "e8d7", "a7a8q"])
+
     def test_parse_dcn(self):
         """Test dcn parsing by first writing a dcn to a file from a board, and
         then load it again and compare the data stored in the original game."""
@@ -242,6 +553,46 @@ class GameSaverTestCase(unittest.TestCase):
             f.close()
         self.assertEqual(file, DCN_FILE)
 
+    def test_save_archive(self):
+        """Test that games saved to a compact archive load with the same headers
+        and moves, including games that start from a position of their own."""
+
+        board = self.create_chess_game()
+        board2 = chess.Board("4k3/P7/8/8/8/8/8/4K3 b - - 0 1")
+        board2.push_uci("e8d7")
+        board2.push_uci("a7a8n")
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "games.sca")
+            archive.save_game(chess.archive.Game({"White": "Weiß"}, board), file)
+            archive.save_game_append(chess.archive.Game({}, board2), file)
+            games = archive.load_file(file)
+            self.assertEqual(len(games), 2)
+            self.assertEqual(list(games.plies), [3, 2])
+            self.assertEqual(games.get_headers(0)["White"], "Weiß")
+            self.assertEqual(list(games.headers["White"]), ["Weiß", "?"])
+            self.assertEqual(games.filter(player="weiß", max_plies=3), [0])
+            self.assertEqual(games.read_game(0).board.move_stack, board.move_stack)
+            self.assertEqual(games.read_game(1).board.fen(), board2.fen())
+            games.close()
+            with chess.archive.open_reader(file) as reader:
+                self.assertEqual(len(reader), 2)
+                self.assertEqual(reader.read_headers(1), ({}, 2))
+                self.assertRaises(IndexError, reader.read_game, 2)
+
+    def test_save_dcn_append(self):
+        """Test that appending games to a dcn keeps the games already in it."""
+
+        game_instance = chess.dcn.Game().from_board(self.create_chess_game())
+        game_instance.set_headers(dcn.load_file(io.StringIO(DCN_FILE)).read_game(0).headers)
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "games.dcn")
+            dcn.save_game(game_instance, file)
+            dcn.save_game_append(game_instance, file)
+            dcn.save_games_append([game_instance, game_instance], file, fsync=True)
+            with open(file) as f:
+                self.assertEqual(f.read(), DCN_FILE * 4)
+                f.close()
+
     def test_parse_pgn(self):
         """Test dcn parsing by first writing a dcn to a file from a board, and
         then load it again and compare the data stored in the original game."""
@@ -260,6 +611,123 @@ class GameSaverTestCase(unittest.TestCase):
             moves2.append(move)
         self.assertEqual(moves, moves2)
 
+    def test_load_dcn(self):
+        """Test that loading a dcn indexes the headers of every game, and parses
+        the one asked for."""
+
+        games = dcn.load_file(io.StringIO(DCN_FILE + DCN_FILE.replace("A Test", "Another Test")))
+        self.assertEqual(len(games), 2)
+        self.assertEqual(games.headers["Event"], ["A Test", "Another Test"])
+        self.assertEqual(games.plies, [3, 3])
+        game_instance = games.read_game(1)
+        self.assertEqual(game_instance.headers["Event"], "Another Test")
+        self.assertEqual(game_instance.moves, list(self.create_chess_game().move_stack))
+
+    def test_load_pgn(self):
+        """Test that loading a pgn indexes every game, including games that are
+        only separated by a single blank line, and parses the one asked for."""
+
+        games = pgn.load_file(io.StringIO(PGN_FILE + PGN_FILE.replace("A Test", "Another Test").strip() + "\n\n" + PGN_FILE))
+        self.assertEqual(len(games), 3)
+        self.assertEqual(games.headers["Event"], ["A Test", "Another Test", "A Test"])
+        self.assertEqual(games.get_headers(1)["White"], "A fake person")
+        self.assertEqual(games.plies, [3, 3, 3])
+        game_instance = games.read_game(1)
+        self.assertEqual(game_instance.headers["Event"], "Another Test")
+        self.assertEqual(
+            list(game_instance.mainline_moves()),
+            list(self.create_chess_game().move_stack)
+        )
+
+    def test_load_pgn_headerless(self):
+        """Test that games without headers are indexed too, each ending at an
+        empty line like they do for chess.pgn."""
+
+        games = pgn.load_file(io.StringIO("1. e4 e5 2. Nf3 Nc6 *\n"))
+        self.assertEqual(len(games), 1)
+        self.assertEqual(games.plies, [4])
+        self.assertEqual(len(list(games.read_game(0).mainline_moves())), 4)
+
+        games = pgn.load_file(io.StringIO("\n1. e4 e5 *\n\n1. d4 {A\n\ncomment} d5 2. c4 *\n\n" + PGN_FILE))
+        self.assertEqual(len(games), 3)
+        self.assertEqual(games.plies, [2, 3, 3])
+        self.assertEqual(games.headers["Event"], ["?", "?", "A Test"])
+        self.assertEqual(len(list(games.read_game(1).mainline_moves())), 3)
+
+    def test_filter_pgn(self):
+        """Test filtering the games of a pgn by their headers and ply counts."""
+
+        games = pgn.load_file(io.StringIO(PGN_FILE + PGN_FILE.replace("Dummy D. Dude", "Someone Else")))
+        self.assertEqual(games.filter(), [0, 1])
+        self.assertEqual(games.filter(player="dude"), [0])
+        self.assertEqual(games.filter(event="test", result="1-0"), [0, 1])
+        self.assertEqual(games.filter(result="0-1"), [])
+        self.assertEqual(games.filter(date_from="1234", date_to="1234.56"), [0, 1])
+        self.assertEqual(games.filter(date_from="1235"), [])
+        self.assertEqual(games.filter(min_plies=3, max_plies=3), [0, 1])
+        self.assertEqual(games.filter(min_plies=4), [])
+
+    def test_filter_pgn_unknown_dates(self):
+        """Test that dates are only compared as far as they are known."""
+
+        games = pgn.load_file(io.StringIO(
+            PGN_FILE.replace("1234.56.78", "????.??.??") +
+            PGN_FILE.replace("1234.56.78", "2010.??.??") +
+            PGN_FILE.replace("1234.56.78", "2010.05.??") +
+            PGN_FILE.replace("1234.56.78", "2010.04.30")
+        ))
+        self.assertEqual(games.filter(date_from="2010"), [1, 2, 3])
+        self.assertEqual(games.filter(date_from="2010.05"), [1, 2])
+        self.assertEqual(games.filter(date_from="2010.05.31"), [1, 2])
+        self.assertEqual(games.filter(date_to="2010.04"), [1, 3])
+        self.assertEqual(games.filter(date_from="2010.05", date_to="2010.05.01"), [1, 2])
+        self.assertEqual(games.filter(date_from="2011"), [])
+        self.assertEqual(games.filter(date_to="2009"), [])
+
+    def test_find_position_pgn(self):
+        """Test finding the games of a pgn that reach a position."""
+
+        games = pgn.load_file(io.StringIO(PGN_FILE + PGN_FILE.replace("2. e4", "2. d4")))
+        board = self.create_chess_game()
+        self.assertEqual(pgn.find_position(games, board), [(0, 3)])
+        board.pop()
+        self.assertEqual(pgn.find_position(games, board), [(0, 2), (1, 2)])
+        self.assertEqual(pgn.find_position(games, chess.Board(FEN)), [])
+
+    def test_load_pgn_index_file(self):
+        """Test that the index of a pgn is written to the index directory, and
+        used again until the pgn changes."""
+
+        with tempfile.TemporaryDirectory() as directory:
+            file = os.path.join(directory, "games.pgn")
+            index_dir = os.path.join(directory, "index")
+            with open(file, "w") as f:
+                f.write(PGN_FILE)
+                f.close()
+            games = pgn.load_file(file, index_dir)
+            self.assertEqual(len(os.listdir(index_dir)), 1)
+            games2 = gameindex.GameIndex(file)
+            self.assertTrue(games2.load(index_dir))
+            self.assertEqual(games2.headers, games.headers)
+            self.assertEqual(games2.offsets, games.offsets)
+            with open(file, "a") as f:
+                f.write(PGN_FILE)
+                f.close()
+            board = self.create_chess_game()
+            key = chess.polyglot.zobrist_hash(board)
+
+            # The positions of a changed file aren't read from, or written to,
+            # its old index file
+            self.assertEqual(pgn.find_position(games, board, index_dir), [(0, 3)])
+            self.assertNotEqual(games.positions, None)
+            self.assertEqual(games2.find_position(key, index_dir), None)
+            self.assertFalse(games2.load(index_dir))
+            games = pgn.load_file(file, index_dir)
+            self.assertEqual(len(games), 2)
+            self.assertEqual(pgn.find_position(games, board, index_dir), [(0, 3), (1, 3)])
+            self.assertEqual(games.positions, None)
+            self.assertEqual(games2.find_position(key, index_dir), [(0, 3), (1, 3)])
+
     def test_save_pgn(self):
         """Test pgn saving by writing a game to a file and then comparing it to
         a string that is what the file should look like."""
@@ -286,5 +754,151 @@ class GameSaverTestCase(unittest.TestCase):
             f.close()
         self.assertEqual(file, PGN_FILE)
 
+class SanCacheTestCase(unittest.TestCase):
+    """A test case for the SAN cache shared by the status frames."""
+
+    def test_update(self):
+        """Test that the cache follows moves being pushed and taken back."""
+
+        cache = san_cache.SanCache()
+        board = chess.Board()
+        for move in ("e4", "e5", "Nf3"):
+            board.push_san(move)
+        self.assertEqual(cache.update(board), ["e4", "e5", "Nf3"])
+        board.pop()
+        board.push_san("Nc3")
+        self.assertEqual(cache.update(board), ["e4", "e5", "Nc3"])
+        board.pop()
+        board.pop()
+        self.assertEqual(cache.update(board), ["e4"])
+
+    def test_update_new_position(self):
+        """Test that the cache starts over for a game from another position."""
+
+        cache = san_cache.SanCache()
+        board = chess.Board()
+        board.push_san("e4")
+        cache.update(board)
+        board = chess.Board(FEN)
+        board.push_san("Qxc5")
+        self.assertEqual(cache.update(board), ["Qxc5"])
+
+class UciAnalysisTestCase(unittest.TestCase):
+    """Tests for the coalescing of the engine's info lines (chess.engine)."""
+
+    def create_engine(self, lines, bestmove=False):
+        """Return a chess.engine.SimpleEngine running the fake engine, sending
+        LINES for each search."""
+        command = [sys.executable, "-c", FAKE_ENGINE, json.dumps(lines)]
+        if bestmove:
+            command.append("bestmove")
+        return chess.engine.SimpleEngine.popen_uci(command)
+
+    def test_coalesce_bestmove(self):
+        """Test that the pending info is delivered before the analysis ends."""
+
+        engine = self.create_engine(["info depth 1 score cp 10 pv e2e4", "info depth 2 score cp 20 pv d2d4"], bestmove=True)
+        try:
+            with engine.analysis(chess.Board(), coalesce=60) as analysis:
+                best = analysis.wait()
+                infos = list(analysis)
+            self.assertEqual(best.move, chess.Move.from_uci("e2e4"))
+            self.assertEqual(len(infos), 1)
+            self.assertEqual(infos[0]["depth"], 2)
+            self.assertEqual(infos[0]["pv"], [chess.Move.from_uci("d2d4")])
+        finally:
+            engine.quit()
+
+    def test_coalesce_multipv(self):
+        """Test that the lines of each multipv slot are merged, and that a line
+        without a pv keeps the pv of the line before it."""
+
+        engine = self.create_engine([
+            "info depth 5 multipv 1 score cp 10 lowerbound pv e2e4",
+            "info depth 5 multipv 2 score cp 5 pv d2d4",
+            "info depth 6 multipv 1 score cp 12 pv e2e4 e7e5",
+            "info depth 7 currmove g1f3 currmovenumber 3",
+            "info hashfull 500",
+            "info multipv 2 nodes 100"
+        ], bestmove=True)
+        try:
+            with engine.analysis(chess.Board(), multipv=2, coalesce=60) as analysis:
+                analysis.wait()
+                infos = list(analysis)
+            self.assertEqual([info["multipv"] for info in infos], [1, 2])
+            self.assertEqual(infos[0]["depth"], 7)
+            self.assertEqual(infos[0]["score"].white(), chess.engine.Cp(12))
+            self.assertNotIn("lowerbound", infos[0])
+            self.assertEqual(infos[0]["pv"], [chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5")])
+            self.assertEqual(infos[0]["currmove"], chess.Move.from_uci("g1f3"))
+            self.assertEqual(infos[0]["hashfull"], 500)
+            self.assertEqual(infos[1]["depth"], 5)
+            self.assertEqual(infos[1]["nodes"], 100)
+            self.assertEqual(infos[1]["pv"], [chess.Move.from_uci("d2d4")])
+        finally:
+            engine.quit()
+
+    def test_coalesce_string(self):
+        """Test that a string is delivered right away, after the info that was
+        pending before it."""
+
+        engine = self.create_engine(["info depth 1 pv e2e4", "info string hello"])
+        try:
+            with engine.analysis(chess.Board(), coalesce=60) as analysis:
+                self.assertEqual(analysis.get()["depth"], 1)
+                self.assertEqual(analysis.get()["string"], "hello")
+        finally:
+            engine.quit()
+
+    def test_coalesce_timer(self):
+        """Test that the pending info is delivered by the timer while the
+        engine is still searching."""
+
+        engine = self.create_engine(["info depth 1 pv e2e4", "info depth 2 pv d2d4"])
+        try:
+            with engine.analysis(chess.Board(), coalesce=0.05) as analysis:
+                self.assertEqual(analysis.get()["depth"], 2)
+        finally:
+            engine.quit()
+
+class UciInfoTestCase(unittest.TestCase):
+    """Tests for the parsing of the engine's info lines (chess.engine)."""
+
+    def test_lazy_pv(self):
+        """Test that a lazy pv gives the same moves as a parsed one, and stops
+        at the first illegal move."""
+
+        board = chess.Board()
+        line = "depth 2 multipv 1 score cp 30 pv e2e4 e7e5 g1f3"
+        info = chess.engine._parse_uci_info(line, board, chess.engine.INFO_ALL | chess.engine.INFO_LAZY_PV)
+        self.assertIsInstance(info["pv"], chess.engine.LazyPv)
+        self.assertEqual(info["pv"].uci, ["e2e4", "e7e5", "g1f3"])
+        self.assertEqual(info["pv"], chess.engine._parse_uci_info(line, board)["pv"])
+        self.assertEqual(info["pv"][1], chess.Move.from_uci("e7e5"))
+        pv = chess.engine._parse_uci_info("pv e2e4 e2e4", board, chess.engine.INFO_ALL | chess.engine.INFO_LAZY_PV)["pv"]
+        self.assertEqual(list(pv), [chess.Move.from_uci("e2e4")])
+
+    def test_parse_uci_info(self):
+        """Test parsing a full info line, and lines with bad values."""
+
+        board = chess.Board()
+        info = chess.engine._parse_uci_info(
+            "depth 9 seldepth 12 multipv 2 score cp -15 upperbound nodes 1000 nps 5000 time 200 wdl 100 800 100 pv e2e4 e7e5 string a b",
+            board
+        )
+        self.assertEqual(info["depth"], 9)
+        self.assertEqual(info["multipv"], 2)
+        self.assertEqual(info["score"], chess.engine.PovScore(chess.engine.Cp(-15), chess.WHITE))
+        self.assertTrue(info["upperbound"])
+        self.assertEqual(info["time"], 0.2)
+        self.assertEqual(info["wdl"].relative, chess.engine.Wdl(100, 800, 100))
+        self.assertEqual(info["pv"], [chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5")])
+        self.assertEqual(info["string"], "a b")
+
+        # Parsing goes on after the value that failed
+        info = chess.engine._parse_uci_info("depth 9 wdl 500 x pv e2e4 e7e5", board)
+        self.assertNotIn("wdl", info)
+        self.assertEqual(info["pv"], [chess.Move.from_uci("e2e4"), chess.Move.from_uci("e7e5")])
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file